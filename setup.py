@@ -1,5 +1,6 @@
-from setuptools import setup, find_packages
+from setuptools import setup
 import os
+import shutil
 from pathlib import Path
 
 # 讀取README檔案
@@ -9,6 +10,22 @@ long_description = (this_directory / "README.md").read_text(encoding="utf-8")
 # 取得主要版本號
 version = "1.0.0"
 
+# 套件清單(明確列出, 不在每次安裝時遞迴掃描目錄)
+# src 下的目錄未全部含 __init__.py, find_packages() 會漏掉它們, 新增子套件時請一併加入
+# 只列出含Python模組的目錄; src/gui/dialogs 被同名模組 dialogs.py 遮蔽, 無法匯入故不列入
+packages = [
+    "src",
+    "src.analyzer",
+    "src.analyzer.resources.templates",
+    "src.gui",
+    "src.ru_parser",
+    "src.utils",
+    "src.visualization",
+    "src.visualization.core",
+    "src.visualization.plots",
+    "src.visualization.widgets",
+]
+
 # 程式相依套件
 requirements = [
     "PyQt6>=6.4.0",
@@ -17,7 +34,6 @@ requirements = [
     "pandas>=1.5.0",
     "openpyxl>=3.0.10",  # 用於Excel檔案處理
     "python-dateutil>=2.8.2",
-    "pyinstaller>=5.6.2",  # 用於打包執行檔
 ]
 
 # 開發用套件
@@ -31,6 +47,44 @@ dev_requirements = [
     "sphinx>=5.3.0",      # 文件產生
 ]
 
+# 打包用套件(只在建立執行檔時需要)
+build_requirements = [
+    "pyinstaller>=5.6.2",  # 用於打包執行檔
+]
+
+# 加速用套件(選用, 有安裝時分析器改用JIT編譯路徑, 圖表改用OpenGL繪製)
+fast_requirements = [
+    "numba>=0.57.0",
+    "orjson>=3.8.0",
+    "PyOpenGL>=3.1.6",
+]
+
+def pyinstaller_args():
+    """取得PyInstaller打包參數
+    
+    Returns:
+        List[str]: 傳給 PyInstaller.__main__.run 的參數清單
+    """
+    return [
+        "--name=ATP分析系統",
+        "--onefile",                     # 打包成單一執行檔
+        "--windowed",                    # Windows GUI應用程式
+        "--icon=src/assets/icons/app.ico",  # 應用程式圖示
+        "--add-data=src/assets;assets",  # 包含資源檔案
+        "--add-data=src/config;config",  # 包含設定檔
+        "--clean",                       # 清理暫存檔
+        "--noconfirm",                   # 覆寫輸出目錄不詢問
+        # 排除執行時不需要的測試/範例/開發工具模組, 縮小執行檔
+        "--exclude-module=pandas.tests",
+        "--exclude-module=numpy.tests",
+        "--exclude-module=pyqtgraph.examples",
+        "--exclude-module=openpyxl.tests",
+        "--exclude-module=sphinx",
+        "--exclude-module=pytest",
+        "--exclude-module=IPython",
+        "src/main.py"                    # 主程式
+    ]
+
 setup(
     name="atp-analyzer",
     version=version,
@@ -40,7 +94,7 @@ setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/tra/atp-analyzer",
-    packages=find_packages(),
+    packages=packages,
     
     # 程式進入點
     entry_points={
@@ -57,6 +111,13 @@ setup(
             "assets/translations/*.qm",
             "config/*.json",
         ],
+        "src.analyzer": [
+            "config/*.yaml",
+        ],
+        "src.analyzer.resources.templates": [
+            "*.html",
+            "*.xlsx",
+        ],
     },
     
     # 相依套件
@@ -65,6 +126,8 @@ setup(
     # 開發用套件
     extras_require={
         "dev": dev_requirements,
+        "fast": fast_requirements,
+        "build": build_requirements,
     },
     
     # 分類資訊
@@ -87,26 +150,31 @@ setup(
     zip_safe=False,  # 不要壓縮套件
 )
 
-# PyInstaller設定
+# PyInstaller設定(打包用套件為選用, 未安裝時略過打包)
 if os.environ.get("PYINSTALLER_BUILD"):
-    import PyInstaller.__main__
-    
-    PyInstaller.__main__.run([
-        "--name=ATP分析系統",
-        "--onefile",                     # 打包成單一執行檔
-        "--windowed",                    # Windows GUI應用程式
-        "--icon=src/assets/icons/app.ico",  # 應用程式圖示
-        "--add-data=src/assets;assets",  # 包含資源檔案
-        "--add-data=src/config;config",  # 包含設定檔
-        "--clean",                       # 清理暫存檔
-        "src/main.py"                    # 主程式
-    ])
+    try:
+        import PyInstaller.__main__
+    except ImportError:
+        print("找不到PyInstaller, 略過執行檔打包 (請安裝: pip install -e .[build])")
+    else:
+        # 以 -OO 最佳化打包的位元組碼(移除assert與docstring)。
+        # 注意: 執行檔內 __doc__ 皆為None, 不可在執行期依賴docstring。
+        os.environ["PYTHONOPTIMIZE"] = "2"
+        
+        # 清除舊的 __pycache__, 避免混入未最佳化的.pyc
+        for cache_dir in (this_directory / "src").rglob("__pycache__"):
+            shutil.rmtree(cache_dir, ignore_errors=True)
+        
+        PyInstaller.__main__.run(pyinstaller_args())
 
 # 打包指令範例
 """
 # 開發環境安裝
 pip install -e .[dev]
 
+# 打包環境安裝
+pip install -e .[build]
+
 # 建立執行檔
 python setup.py build
 
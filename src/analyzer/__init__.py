@@ -16,19 +16,11 @@
 - utils: 工具函數
 """
 
+import importlib
 import logging
 from pathlib import Path
-from typing import Optional, Dict, Any
-
-from .atp_analyzer import ATPAnalyzer
-from .models import (
-    RURecord,
-    SpeedProfile,
-    EventRecord, 
-    StationRecord,
-    AnalysisResult,
-    AnalysisConfig
-)
+from typing import Optional, Dict, Any, TYPE_CHECKING
+
 from .exceptions import (
     ATPAnalyzerError,
     DataValidationError,
@@ -37,7 +29,43 @@ from .exceptions import (
     ConfigError,
     ExportError
 )
-from .config import Config
+
+if TYPE_CHECKING:
+    from .atp_analyzer import ATPAnalyzer
+    from .models import (
+        RURecord,
+        SpeedProfile,
+        EventRecord,
+        StationRecord,
+        AnalysisResult,
+        AnalysisConfig
+    )
+    from .config import Config
+
+# 延遲載入的名稱: 首次存取時才匯入對應模組(避免啟動時即載入pandas/numpy)
+_LAZY = {
+    'ATPAnalyzer': '.atp_analyzer',
+    'RURecord': '.models',
+    'SpeedProfile': '.models',
+    'EventRecord': '.models',
+    'StationRecord': '.models',
+    'AnalysisResult': '.models',
+    'AnalysisConfig': '.models',
+    'Config': '.config'
+}
+
+def __getattr__(name: str):
+    """延遲載入公開名稱(PEP 562)"""
+    if name in _LAZY:
+        module = importlib.import_module(_LAZY[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    """列出模組名稱(包含延遲載入的名稱)"""
+    return sorted(list(globals()) + list(_LAZY))
 
 # 版本資訊
 __version__ = "1.0.0"
@@ -78,7 +106,7 @@ def setup_logging(log_file: Optional[str] = None,
         
     logger.info(f"日誌系統已初始化: level={log_level}, file={log_file}")
 
-def create_analyzer(config: Optional[Dict[str, Any]] = None) -> ATPAnalyzer:
+def create_analyzer(config: Optional[Dict[str, Any]] = None) -> 'ATPAnalyzer':
     """建立分析器實例
     
     Args:
@@ -87,6 +115,7 @@ def create_analyzer(config: Optional[Dict[str, Any]] = None) -> ATPAnalyzer:
     Returns:
         ATPAnalyzer: 分析器實例
     """
+    from .atp_analyzer import ATPAnalyzer
     return ATPAnalyzer(config)
 
 # ATP事件類型定義
@@ -0,0 +1,218 @@
+# src/analyzer/_kernels.py
+
+"""numba編譯的數值核心(選用)
+
+本模組在匯入時即需要numba; 呼叫端以 try/except ImportError 匯入,
+未安裝numba時改用NumPy實作。核心皆以nogil編譯, 執行期間釋放GIL,
+可由執行緒池(如 CombinedAnalyzer.analyze_all)同時執行。
+"""
+
+import numpy as np
+from numba import njit
+
+@njit(cache=True, fastmath=True, nogil=True)
+def _analyze_numeric_numba(speeds, threshold_raw, bin_width, nbins):
+    """單次迴圈計算速度總和、最大值、超速次數與等寬直方圖
+    
+    直方圖需逐筆累加同一陣列, 因此以單執行緒迴圈處理(不使用prange)。
+    
+    Args:
+        speeds: 速度陣列(0.01 km/h, 至少一筆)
+        threshold_raw: 超速閾值(0.01 km/h)
+        bin_width: 區間寬度(0.01 km/h)
+        nbins: 區間數(自0起算)
+        
+    Returns:
+        Tuple: (速度總和, 最大速度, 超速次數, 各區間次數)
+    """
+    hist = np.zeros(nbins, dtype=np.int64)
+    upper = bin_width * nbins
+    total = 0
+    max_speed = speeds[0]
+    over_count = 0
+    for i in range(speeds.shape[0]):
+        s = speeds[i]
+        total += s
+        if s > max_speed:
+            max_speed = s
+        if s > threshold_raw:
+            over_count += 1
+        # 與np.histogram相同: 最後一個區間包含右端點
+        if 0 <= s < upper:
+            hist[s // bin_width] += 1
+        elif s == upper:
+            hist[nbins - 1] += 1
+    return total, max_speed, over_count, hist
+
+@njit(cache=True, nogil=True)
+def _match_speeds(ru_t, mmi_t, tol):
+    """以雙指標尋找每個RU時間點最接近的MMI記錄
+    
+    Args:
+        ru_t: RU時間(秒, 已遞增排序)
+        mmi_t: MMI時間(秒, 已遞增排序)
+        tol: 時間匹配容許誤差(秒)
+        
+    Returns:
+        np.ndarray: 對應的MMI索引, 超出容許誤差或無MMI記錄時為-1
+    """
+    n = ru_t.shape[0]
+    m = mmi_t.shape[0]
+    closest = np.full(n, -1, dtype=np.int64)
+    j = 0
+    for i in range(n):
+        t = ru_t[i]
+        # j 為第一個不早於 t 的MMI記錄
+        while j < m and mmi_t[j] < t:
+            j += 1
+            
+        best = -1
+        best_dt = 0.0
+        if j > 0:
+            # 時間相同的MMI記錄取第一筆(與依序取最小值相同)
+            best = j - 1
+            while best > 0 and mmi_t[best - 1] == mmi_t[best]:
+                best -= 1
+            best_dt = abs(mmi_t[best] - t)
+        if j < m and (best < 0 or abs(mmi_t[j] - t) < best_dt):
+            best = j
+            best_dt = abs(mmi_t[j] - t)
+            
+        if best >= 0 and best_dt <= tol:
+            closest[i] = best
+    return closest
+
+@njit(cache=True, nogil=True)
+def _gap_scan(ts_us, max_interval_us):
+    """尋找相鄰時間間隔超過上限的位置
+    
+    Args:
+        ts_us: 時間序列(微秒, int64)
+        max_interval_us: 最大允許間隔(微秒)
+        
+    Returns:
+        Tuple: (間隔起點索引, 間隔長度(微秒))
+    """
+    n = ts_us.shape[0]
+    count = 0
+    for i in range(n - 1):
+        if ts_us[i + 1] - ts_us[i] > max_interval_us:
+            count += 1
+            
+    starts = np.empty(count, dtype=np.int64)
+    durations = np.empty(count, dtype=np.int64)
+    k = 0
+    for i in range(n - 1):
+        interval = ts_us[i + 1] - ts_us[i]
+        if interval > max_interval_us:
+            starts[k] = i
+            durations[k] = interval
+            k += 1
+    return starts, durations
+
+@njit(cache=True, nogil=True)
+def _classify_events(log_types, codes, evt_idx, nevents, abnormal_lut):
+    """單次迴圈分類事件記錄
+    
+    Args:
+        log_types: 記錄類型陣列
+        codes: 狀態碼陣列(資料首位元組, 無資料時為-1)
+        evt_idx: 記錄類型 -> 事件索引查表(非事件為-1)
+        nevents: 事件類型數
+        abnormal_lut: [事件索引, 狀態碼] -> 是否為異常的查表
+        
+    Returns:
+        Tuple: (各類型事件數, 緊急煞車索引, ATP關機索引,
+                異常事件索引緩衝區[事件索引, :], 各類型異常事件數)
+    """
+    n = log_types.shape[0]
+    nlut = evt_idx.shape[0]
+    ntypes = abnormal_lut.shape[0]
+    counts = np.zeros(nevents, dtype=np.int64)
+    emergency = np.empty(n, dtype=np.int64)
+    atp_down = np.empty(n, dtype=np.int64)
+    abnormal = np.empty((ntypes, n), dtype=np.int64)
+    abnormal_n = np.zeros(ntypes, dtype=np.int64)
+    n_emergency = 0
+    n_down = 0
+    for i in range(n):
+        t = log_types[i]
+        if t < 0 or t >= nlut:
+            continue
+        k = evt_idx[t]
+        if k < 0:
+            continue
+        counts[k] += 1
+        if t == 201:
+            atp_down[n_down] = i
+            n_down += 1
+            continue
+        code = codes[i]
+        if t == 2 and code == 2:
+            emergency[n_emergency] = i
+            n_emergency += 1
+        if code >= 0 and abnormal_lut[k, code]:
+            abnormal[k, abnormal_n[k]] = i
+            abnormal_n[k] += 1
+    return (counts, emergency[:n_emergency], atp_down[:n_down],
+            abnormal, abnormal_n)
+
+@njit(cache=True, nogil=True)
+def _scan_records(log_types, timestamp_ns, speeds, locations):
+    """單次迴圈計算資料驗證所需的統計值
+    
+    Args:
+        log_types: 記錄類型陣列
+        timestamp_ns: 時間陣列(奈秒, 至少兩筆)
+        speeds: 速度陣列(0.01 km/h)
+        locations: 位置陣列(0.01 m)
+        
+    Returns:
+        Tuple: (最小時間間隔, 最大時間間隔, 位置記錄數, 最高速度,
+                最大速度增量, 最小速度增量, 最小位置增量, 最大位置增量)
+    """
+    n = log_types.shape[0]
+    min_gap = timestamp_ns[1] - timestamp_ns[0]
+    max_gap = min_gap
+    for i in range(2, n):
+        gap = timestamp_ns[i] - timestamp_ns[i - 1]
+        if gap < min_gap:
+            min_gap = gap
+        if gap > max_gap:
+            max_gap = gap
+            
+    n_pos = 0
+    max_speed = 0.0
+    max_acc = 0.0
+    max_dec = 0.0
+    min_loc_diff = 0.0
+    max_loc_diff = 0.0
+    prev_speed = 0.0
+    prev_loc = 0.0
+    for i in range(n):
+        if log_types[i] != 211:
+            continue
+        # 與NumPy實作相同: 先換算單位再相減
+        s = speeds[i] / 100.0
+        loc = locations[i] / 100000.0
+        if n_pos == 0 or s > max_speed:
+            max_speed = s
+        if n_pos == 1:
+            max_acc = max_dec = s - prev_speed
+            min_loc_diff = max_loc_diff = loc - prev_loc
+        elif n_pos > 1:
+            ds = s - prev_speed
+            dl = loc - prev_loc
+            if ds > max_acc:
+                max_acc = ds
+            if ds < max_dec:
+                max_dec = ds
+            if dl < min_loc_diff:
+                min_loc_diff = dl
+            if dl > max_loc_diff:
+                max_loc_diff = dl
+        prev_speed = s
+        prev_loc = loc
+        n_pos += 1
+    return (min_gap, max_gap, n_pos, max_speed, max_acc, max_dec,
+            min_loc_diff, max_loc_diff)
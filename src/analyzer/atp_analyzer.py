@@ -1,11 +1,10 @@
 # src/analyzer/atp_analyzer.py
 
+import itertools
 import logging
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple, Any
-import numpy as np
-import pandas as pd
+from typing import List, Dict, Iterable, Optional, Tuple, Any, TYPE_CHECKING
 from pathlib import Path
 
 from .exceptions import (
@@ -19,7 +18,16 @@ from .processors import (
     EventProcessor, 
     LocationProcessor
 )
-from .models import RURecord, AnalysisResult
+from .models import RURecord, RecordArrays, AnalysisResult
+from .utils import format_timedelta, lazy_import
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import openpyxl
+else:
+    # 首次使用時才載入, pandas只在匯出結果時需要
+    pd = lazy_import('pandas')
+    openpyxl = lazy_import('openpyxl')
 
 logger = logging.getLogger(__name__)
 
@@ -47,7 +55,9 @@ class ATPAnalyzer:
         self.config = config or self._get_default_config()
         self.validator = DataValidator()
         self.speed_processor = SpeedProcessor()
-        self.event_processor = EventProcessor()
+        self.event_processor = EventProcessor(
+            max_details=self.config.get('max_details', 50)
+        )
         self.location_processor = LocationProcessor()
         
         # 設定運算參數
@@ -61,6 +71,7 @@ class ATPAnalyzer:
         return {
             'chunk_size': 1000,
             'speed_threshold': 90.0,
+            'max_details': 50,
             'cache_enabled': True,
             'parallel_enabled': True,
             'log_level': 'INFO'
@@ -86,29 +97,57 @@ class ATPAnalyzer:
         try:
             # 驗證資料
             self.validator.validate_records(records)
+        except DataValidationError as e:
+            logger.error(f"資料驗證失敗: {e}")
+            raise
             
-            # 將記錄轉換為DataFrame
-            df = self._records_to_dataframe(records)
+        return self.analyze_streaming(iter(records), callback=callback,
+                                      total=len(records))
+        
+    def analyze_streaming(self, record_iter: Iterable[RURecord],
+                          callback: Optional[callable] = None,
+                          total: Optional[int] = None) -> AnalysisResult:
+        """以固定大小分批串流分析ATP記錄
+        
+        每批最多 chunk_size 筆記錄轉為欄式陣列後累計至各處理器,
+        記憶體用量與批次大小成正比而非記錄總數.
+        
+        Args:
+            record_iter: ATP記錄迭代器
+            callback: 進度回調函數
+            total: 記錄總數(已知時用於回報進度)
             
-            # 分析速度特性
-            speed_stats = self.speed_processor.analyze(
-                df,
-                threshold=self.speed_threshold,
-                chunk_size=self.chunk_size,
-                callback=callback
-            )
+        Returns:
+            AnalysisResult: 分析結果
             
-            # 分析事件記錄
-            event_stats = self.event_processor.analyze(
-                df,
-                callback=callback
-            )
+        Raises:
+            AnalysisError: 分析過程錯誤
+        """
+        try:
+            record_iter = iter(record_iter)
+            self.speed_processor.begin(threshold=self.speed_threshold)
+            self.event_processor.begin()
+            self.location_processor.begin()
             
-            # 分析位置資訊
-            location_stats = self.location_processor.analyze(
-                df,
-                callback=callback
-            )
+            processed = 0
+            while True:
+                batch = list(itertools.islice(record_iter, self.chunk_size))
+                if not batch:
+                    break
+                    
+                # 將本批記錄轉換為欄式陣列並累計
+                arrays = RecordArrays.from_records(batch)
+                self.speed_processor.update(arrays)
+                self.event_processor.update(arrays)
+                self.location_processor.update(arrays)
+                
+                processed += len(batch)
+                if callback and total:
+                    callback(min(int(processed * 100 / total), 100))
+                    
+            speed_stats = self.speed_processor.finish()
+            event_stats = self.event_processor.finish()
+            location_stats = self.location_processor.finish()
             
             # 整合分析結果
             result = AnalysisResult(
@@ -124,38 +163,13 @@ class ATPAnalyzer:
                 event_stats=event_stats
             )
             
-            logger.info("分析完成")
+            logger.info(f"分析完成, 共 {processed} 筆記錄")
             return result
             
-        except DataValidationError as e:
-            logger.error(f"資料驗證失敗: {e}")
-            raise
         except Exception as e:
             logger.error(f"分析過程發生錯誤: {e}", exc_info=True)
             raise AnalysisError(f"分析失敗: {e}")
             
-    def _records_to_dataframe(self, records: List[RURecord]) -> pd.DataFrame:
-        """將記錄轉換為DataFrame
-        
-        Args:
-            records: ATP記錄列表
-            
-        Returns:
-            pd.DataFrame: 記錄DataFrame
-        """
-        data = []
-        for record in records:
-            row = {
-                'timestamp': record.timestamp,
-                'log_type': record.log_type,
-                'location': record.location / 100000.0,  # 轉換為km
-                'speed': record.speed / 100.0,  # 轉換為km/h
-                'data': record.data
-            }
-            data.append(row)
-            
-        return pd.DataFrame(data)
-        
     def generate_report(self, result: AnalysisResult, 
                        report_type: str = 'summary') -> Dict[str, Any]:
         """產生分析報告
@@ -175,7 +189,7 @@ class ATPAnalyzer:
                     '最高速度': f"{result.max_speed:.1f} km/h",
                     '平均速度': f"{result.avg_speed:.1f} km/h",
                     '總距離': f"{result.total_distance:.1f} km",
-                    '總時間': str(result.total_time),
+                    '總時間': format_timedelta(result.total_time),
                     '超速次數': result.over_speed_count,
                     '緊急煞車次數': result.emergency_brake_count,
                     'ATP關機次數': result.atp_down_count
@@ -189,7 +203,7 @@ class ATPAnalyzer:
                     '最高速度': f"{result.max_speed:.1f} km/h",
                     '平均速度': f"{result.avg_speed:.1f} km/h",
                     '總距離': f"{result.total_distance:.1f} km",
-                    '總時間': str(result.total_time),
+                    '總時間': format_timedelta(result.total_time),
                     '超速次數': result.over_speed_count,
                     '緊急煞車次數': result.emergency_brake_count,
                     'ATP關機次數': result.atp_down_count
@@ -229,30 +243,38 @@ class ATPAnalyzer:
         
         try:
             # 準備匯出資料
+            basic_stats = result.get_basic_stats()
+            speed_dist = result.speed_stats['速度分布']
+            event_counts = result.event_stats['事件統計']
             export_data = {
-                '基本統計': pd.DataFrame([{
-                    '項目': k,
-                    '數值': v
-                } for k, v in result.get_basic_stats().items()]),
+                '基本統計': pd.DataFrame({
+                    '項目': list(basic_stats.keys()),
+                    '數值': list(basic_stats.values())
+                }),
                 
-                '速度分析': pd.DataFrame([{
-                    '區間': k,
-                    '次數': v
-                } for k, v in result.speed_stats['速度分布'].items()]),
+                '速度分析': pd.DataFrame({
+                    '區間': list(speed_dist.keys()),
+                    '次數': list(speed_dist.values())
+                }),
                 
-                '事件統計': pd.DataFrame([{
-                    '事件類型': k,
-                    '發生次數': v
-                } for k, v in result.event_stats['事件統計'].items()])
+                '事件統計': pd.DataFrame({
+                    '事件類型': list(event_counts.keys()),
+                    '發生次數': list(event_counts.values())
+                })
             }
             
             # 依格式匯出
             for fmt in formats:
                 if fmt == 'xlsx':
+                    # 以write-only活頁簿逐列寫出, 不在記憶體保留整份活頁簿
                     excel_path = export_dir / 'analysis_result.xlsx'
-                    with pd.ExcelWriter(excel_path) as writer:
-                        for sheet_name, df in export_data.items():
-                            df.to_excel(writer, sheet_name=sheet_name, index=False)
+                    workbook = openpyxl.Workbook(write_only=True)
+                    for sheet_name, df in export_data.items():
+                        worksheet = workbook.create_sheet(sheet_name)
+                        worksheet.append(list(df.columns))
+                        for row in df.itertuples(index=False, name=None):
+                            worksheet.append(row)
+                    workbook.save(excel_path)
                     exported_files['excel'] = excel_path
                     
                 elif fmt == 'csv':
@@ -260,7 +282,8 @@ class ATPAnalyzer:
                     csv_dir.mkdir(exist_ok=True)
                     for name, df in export_data.items():
                         csv_path = csv_dir / f'{name}.csv'
-                        df.to_csv(csv_path, index=False)
+                        df.to_csv(csv_path, index=False,
+                                  lineterminator='\n', chunksize=10000)
                         exported_files[f'csv_{name}'] = csv_path
                         
             logger.info(f"匯出完成: {exported_files}")
@@ -1,9 +1,101 @@
-from typing import List, Dict, Tuple
+import io
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple, Union
 import numpy as np
 from datetime import datetime, timedelta
 from ..parsers.ru_parser import RUParser, RURecord
 from ..parsers.mmi_parser import MMIParser, MMIRecord
 
+def _to_datetime64(times) -> np.ndarray:
+    """將datetime序列轉換為datetime64[us]陣列
+    
+    時間差直接以int64微秒相減, 不再逐筆建立timedelta。
+    """
+    return np.fromiter(times, dtype='datetime64[us]')
+
+def _to_seconds(times: np.ndarray) -> np.ndarray:
+    """將datetime64[us]陣列轉換為秒數(float64), 供numba核心使用"""
+    return times.astype(np.int64) * 1e-6
+
+def _match_speeds_numpy(ru_t: np.ndarray, mmi_t: np.ndarray,
+                        tol: float) -> np.ndarray:
+    """尋找每個RU時間點最接近的MMI記錄(NumPy實作)
+    
+    Args:
+        ru_t: RU時間(秒, 已遞增排序)
+        mmi_t: MMI時間(秒, 已遞增排序)
+        tol: 時間匹配容許誤差(秒)
+        
+    Returns:
+        np.ndarray: 對應的MMI索引, 超出容許誤差或無MMI記錄時為-1
+    """
+    closest = np.full(len(ru_t), -1, dtype=np.int64)
+    if not len(mmi_t):
+        return closest
+        
+    # 比較前後兩個相鄰的MMI記錄, 距離相同時取較早者
+    right = np.searchsorted(mmi_t, ru_t)
+    left = np.maximum(right - 1, 0)
+    right = np.minimum(right, len(mmi_t) - 1)
+    # 時間相同的MMI記錄取第一筆(與依序取最小值相同)
+    left = np.searchsorted(mmi_t, mmi_t[left], side='left')
+    use_left = np.abs(mmi_t[left] - ru_t) <= np.abs(mmi_t[right] - ru_t)
+    nearest = np.where(use_left, left, right)
+    matched = np.abs(mmi_t[nearest] - ru_t) <= tol
+    closest[matched] = nearest[matched]
+    return closest
+
+def _gap_scan_numpy(ts_us: np.ndarray,
+                    max_interval_us: float) -> Tuple[np.ndarray, np.ndarray]:
+    """尋找相鄰時間間隔超過上限的位置(NumPy實作)
+    
+    Args:
+        ts_us: 時間序列(微秒, int64)
+        max_interval_us: 最大允許間隔(微秒)
+        
+    Returns:
+        Tuple: (間隔起點索引, 間隔長度(微秒))
+    """
+    intervals = np.diff(ts_us)
+    starts = np.flatnonzero(intervals > max_interval_us)
+    return starts, intervals[starts]
+
+try:
+    from ._kernels import _match_speeds, _gap_scan
+except ImportError:  # 未安裝numba時使用NumPy實作
+    _match_speeds = _match_speeds_numpy
+    _gap_scan = _gap_scan_numpy
+
+# 事件對應關係 RU事件類型: {對應的MMI事件類型}
+_RELATED_EVENTS = {
+    2: frozenset({MMIParser.EVENT_ERROR}),  # ATP狀態變更 vs MMI錯誤
+    3: frozenset({MMIParser.EVENT_MODE_CHANGE}),  # MMI狀態變更 vs 模式切換
+    91: frozenset({MMIParser.EVENT_USER_ACTION})  # PRS事件 vs 使用者操作
+}
+
+# 分析報告固定段落
+_REPORT_HEADER = """ATP與MMI整合分析報告
+==================================================
+
+速度記錄分析:
+- 平均速度差異: {avg_difference:.2f} km/h
+- 最大速度差異: {max_difference:.2f} km/h
+- 標準差: {std_difference:.2f} km/h
+- 匹配點數: {match_count}
+- 異常點數: {abnormal_count}
+
+事件對應分析:
+- 事件對應率: {correlation_rate:.1%}
+- 對應事件數: {correlated_count}
+- 未配對ATP事件: {unpaired_ru_count}
+- 未配對MMI事件: {unpaired_mmi_count}
+
+系統一致性分析:
+時間覆蓋範圍:
+- ATP: {ru_start} 至 {ru_end}
+- MMI: {mmi_start} 至 {mmi_end}
+- 重疊時間: {overlap_start} 至 {overlap_end}"""
+
 class CombinedAnalyzer:
     """ATP與MMI整合分析器"""
     
@@ -11,83 +103,147 @@ class CombinedAnalyzer:
         self.time_tolerance = 1.0  # 時間匹配容許誤差(秒)
         self.speed_tolerance = 2.0  # 速度匹配容許誤差(km/h)
         
+    def analyze_all(self,
+                   ru_records: List[RURecord],
+                   mmi_records: List[MMIRecord],
+                   ru_speeds: List[Tuple[datetime, float]],
+                   mmi_speeds: List[Tuple[datetime, float]],
+                   ru_events: List[Dict],
+                   mmi_events: List[Dict]) -> Tuple[Dict, Dict, Dict]:
+        """同時執行速度、事件與系統一致性分析
+        
+        三項分析彼此獨立, 以執行緒並行; 陣列運算期間會釋放GIL。
+        
+        Returns:
+            Tuple[Dict, Dict, Dict]: (速度相關性, 事件相關性, 系統一致性),
+                可直接傳入 generate_analysis_report
+        """
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            speed_future = executor.submit(
+                self.analyze_speed_correlation, ru_speeds, mmi_speeds
+            )
+            event_future = executor.submit(
+                self.analyze_event_correlation, ru_events, mmi_events
+            )
+            system_future = executor.submit(
+                self.analyze_system_consistency, ru_records, mmi_records
+            )
+            return (
+                speed_future.result(),
+                event_future.result(),
+                system_future.result()
+            )
+            
     def analyze_speed_correlation(self, 
                                 ru_speeds: List[Tuple[datetime, float]],
                                 mmi_speeds: List[Tuple[datetime, float]]) -> Dict:
         """分析速度相關性"""
+        # 轉換為時間(秒)與速度陣列
+        ru_t = _to_seconds(_to_datetime64(t for t, _ in ru_speeds))
+        ru_s = np.fromiter((s for _, s in ru_speeds),
+                           dtype=np.float64, count=len(ru_speeds))
+        mmi_t = _to_seconds(_to_datetime64(t for t, _ in mmi_speeds))
+        mmi_s = np.fromiter((s for _, s in mmi_speeds),
+                            dtype=np.float64, count=len(mmi_speeds))
+        
+        # 兩邊記錄各依時間排序一次
+        order = np.argsort(mmi_t, kind='stable')
+        mmi_t = mmi_t[order]
+        mmi_s = mmi_s[order]
+        ru_order = np.argsort(ru_t, kind='stable')
+        
         # 查找最接近的時間點進行速度比對
-        differences = []
-        matched_points = []
-        
-        for ru_time, ru_speed in ru_speeds:
-            # 尋找最接近的MMI記錄
-            closest_mmi = min(
-                mmi_speeds,
-                key=lambda x: abs((x[0] - ru_time).total_seconds()),
-                default=None
-            )
+        closest = np.empty(len(ru_t), dtype=np.int64)
+        closest[ru_order] = _match_speeds(ru_t[ru_order], mmi_t, self.time_tolerance)
             
-            if closest_mmi:
-                time_diff = (closest_mmi[0] - ru_time).total_seconds()
-                if abs(time_diff) <= self.time_tolerance:
-                    speed_diff = closest_mmi[1] - ru_speed
-                    differences.append(speed_diff)
-                    matched_points.append({
-                        'time': ru_time,
-                        'ru_speed': ru_speed,
-                        'mmi_speed': closest_mmi[1],
-                        'difference': speed_diff
-                    })
+        matched_idx = np.flatnonzero(closest >= 0)
+        differences = mmi_s[closest[matched_idx]] - ru_s[matched_idx]
+        
+        # 沒有匹配點時無法計算統計值
+        if not len(differences):
+            return {
+                'avg_difference': 0.0,
+                'max_difference': 0.0,
+                'std_difference': 0.0,
+                'match_count': 0,
+                'abnormal_points': []
+            }
+            
+        abs_differences = np.abs(differences)
+        
+        # 只為異常點建立明細
+        abnormal = np.flatnonzero(abs_differences > self.speed_tolerance)
+        abnormal_points = []
+        for k in abnormal:
+            ru_time, ru_speed = ru_speeds[matched_idx[k]]
+            abnormal_points.append({
+                'time': ru_time,
+                'ru_speed': ru_speed,
+                'mmi_speed': mmi_speeds[order[closest[matched_idx[k]]]][1],
+                'difference': float(differences[k])
+            })
                     
         return {
-            'avg_difference': float(np.mean(differences)),
-            'max_difference': float(np.max(np.abs(differences))),
-            'std_difference': float(np.std(differences)),
-            'match_count': len(matched_points),
-            'abnormal_points': [
-                p for p in matched_points
-                if abs(p['difference']) > self.speed_tolerance
-            ]
+            'avg_difference': float(differences.mean()),
+            'max_difference': float(abs_differences.max()),
+            'std_difference': float(differences.std()),
+            'match_count': len(matched_idx),
+            'abnormal_points': abnormal_points
         }
         
     def analyze_event_correlation(self,
                                 ru_events: List[Dict],
                                 mmi_events: List[Dict]) -> Dict:
         """分析事件相關性"""
-        # 配對相關事件
-        correlated_events = []
-        unpaired_ru_events = []
-        unpaired_mmi_events = []
+        # 依時間(微秒)排序一次, 以雙指標掃描時間窗內的MMI事件
+        ru_times = _to_datetime64(e['time'] for e in ru_events).astype(np.int64).tolist()
+        mmi_times = _to_datetime64(e['time'] for e in mmi_events).astype(np.int64).tolist()
+        tolerance = self.time_tolerance * 1e6
+        ru_order = sorted(range(len(ru_events)), key=ru_times.__getitem__)
+        mmi_order = sorted(range(len(mmi_events)), key=mmi_times.__getitem__)
+        sorted_mmi_times = [mmi_times[k] for k in mmi_order]
         
-        for ru_event in ru_events:
+        # 配對相關事件(記錄每個RU事件對應的MMI事件索引)
+        matches = [None] * len(ru_events)
+        mmi_paired = np.zeros(len(mmi_events), dtype=bool)
+        j = 0
+        for i in ru_order:
+            ru_time = ru_times[i]
+            allowed = _RELATED_EVENTS.get(ru_events[i].get('type'))
+            while j < len(mmi_order) and sorted_mmi_times[j] < ru_time - tolerance:
+                j += 1
+                
+            if allowed is None:
+                continue
+                
             # 尋找時間相近的MMI事件
-            matched = False
-            ru_time = ru_event['time']
-            
-            for mmi_event in mmi_events:
-                mmi_time = mmi_event['time']
-                time_diff = (mmi_time - ru_time).total_seconds()
+            k = j
+            while k < len(mmi_order) and sorted_mmi_times[k] <= ru_time + tolerance:
+                # 檢查是否為相關事件
+                if mmi_events[mmi_order[k]].get('event_type') in allowed:
+                    matches[i] = mmi_order[k]
+                    mmi_paired[mmi_order[k]] = True
+                    break
+                k += 1
                 
-                if abs(time_diff) <= self.time_tolerance:
-                    # 檢查是否為相關事件
-                    if self._are_events_related(ru_event, mmi_event):
-                        correlated_events.append({
-                            'time': ru_time,
-                            'ru_event': ru_event,
-                            'mmi_event': mmi_event,
-                            'time_diff': time_diff
-                        })
-                        matched = True
-                        break
-                        
-            if not matched:
+        correlated_events = []
+        unpaired_ru_events = []
+        for ru_event, ru_time, m in zip(ru_events, ru_times, matches):
+            if m is None:
                 unpaired_ru_events.append(ru_event)
+                continue
+                
+            correlated_events.append({
+                'time': ru_event['time'],
+                'ru_event': ru_event,
+                'mmi_event': mmi_events[m],
+                'time_diff': (mmi_times[m] - ru_time) / 1e6
+            })
                 
         # 找出未配對的MMI事件
-        paired_mmi_times = {e['mmi_event']['time'] for e in correlated_events}
         unpaired_mmi_events = [
-            e for e in mmi_events
-            if e['time'] not in paired_mmi_times
+            e for e, paired in zip(mmi_events, mmi_paired)
+            if not paired
         ]
         
         return {
@@ -103,11 +259,12 @@ class CombinedAnalyzer:
                                  mmi_records: List[MMIRecord]) -> Dict:
         """分析系統一致性"""
         # 檢查記錄時間範圍
-        ru_times = [r.timestamp for r in ru_records]
-        mmi_times = [r.timestamp for r in mmi_records]
+        # 直接建立datetime64陣列(不經過中間列表), 範圍與間隔檢查共用
+        ru_times = _to_datetime64(r.timestamp for r in ru_records)
+        mmi_times = _to_datetime64(r.timestamp for r in mmi_records)
         
-        ru_start, ru_end = min(ru_times), max(ru_times)
-        mmi_start, mmi_end = min(mmi_times), max(mmi_times)
+        ru_start, ru_end = ru_times.min().item(), ru_times.max().item()
+        mmi_start, mmi_end = mmi_times.min().item(), mmi_times.max().item()
         
         time_coverage = {
             'ru_start': ru_start,
@@ -138,70 +295,63 @@ class CombinedAnalyzer:
         
     def _are_events_related(self, ru_event: Dict, mmi_event: Dict) -> bool:
         """判斷兩個事件是否相關"""
-        # 定義事件對應關係
-        related_events = {
-            # RU事件類型: [對應的MMI事件類型]
-            2: [MMIParser.EVENT_ERROR],  # ATP狀態變更 vs MMI錯誤
-            3: [MMIParser.EVENT_MODE_CHANGE],  # MMI狀態變更 vs 模式切換
-            91: [MMIParser.EVENT_USER_ACTION]  # PRS事件 vs 使用者操作
-        }
-        
-        return ru_event.get('type') in related_events and \
-               mmi_event.get('event_type') in related_events[ru_event['type']]
+        allowed = _RELATED_EVENTS.get(ru_event.get('type'))
+        return allowed is not None and mmi_event.get('event_type') in allowed
                
-    def _find_time_gaps(self, timestamps: List[datetime],
+    def _find_time_gaps(self, timestamps: Union[List[datetime], np.ndarray],
                        max_interval: float = 5.0) -> List[Dict]:
-        """尋找時間序列中的間隔"""
-        gaps = []
-        for t1, t2 in zip(timestamps[:-1], timestamps[1:]):
-            interval = (t2 - t1).total_seconds()
-            if interval > max_interval:
-                gaps.append({
-                    'start': t1,
-                    'end': t2,
-                    'duration': interval
-                })
-        return gaps
+        """尋找時間序列中的間隔
+        
+        Args:
+            timestamps: 時間序列(datetime列表或datetime64陣列)
+            max_interval: 最大允許間隔(秒)
+            
+        Returns:
+            List[Dict]: 間隔列表
+        """
+        ts = np.asarray(timestamps, dtype='datetime64[us]')
+        starts, durations = _gap_scan(ts.astype(np.int64), max_interval * 1e6)
+        
+        # 只為超過間隔的位置建立明細
+        return [
+            {
+                'start': ts[i].item(),
+                'end': ts[i + 1].item(),
+                'duration': duration / 1e6
+            }
+            for i, duration in zip(starts.tolist(), durations.tolist())
+        ]
         
     def generate_analysis_report(self, speed_corr: Dict,
                                event_corr: Dict,
                                system_cons: Dict) -> str:
         """產生分析報告"""
-        lines = [
-            "ATP與MMI整合分析報告",
-            "=" * 50,
-            "\n速度記錄分析:
-"ATP與MMI整合分析報告",
-            "=" * 50,
-            "\n速度記錄分析:",
-            f"- 平均速度差異: {speed_corr['avg_difference']:.2f} km/h",
-            f"- 最大速度差異: {speed_corr['max_difference']:.2f} km/h",
-            f"- 標準差: {speed_corr['std_difference']:.2f} km/h",
-            f"- 匹配點數: {speed_corr['match_count']}",
-            f"- 異常點數: {len(speed_corr['abnormal_points'])}",
+        buf = io.StringIO()
+        w = buf.write
+        
+        w(_REPORT_HEADER.format(
+            avg_difference=speed_corr['avg_difference'],
+            max_difference=speed_corr['max_difference'],
+            std_difference=speed_corr['std_difference'],
+            match_count=speed_corr['match_count'],
+            abnormal_count=len(speed_corr['abnormal_points']),
+            correlation_rate=event_corr['correlation_rate'],
+            correlated_count=len(event_corr['correlated_events']),
+            unpaired_ru_count=len(event_corr['unpaired_ru_events']),
+            unpaired_mmi_count=len(event_corr['unpaired_mmi_events']),
+            **system_cons['time_coverage']
+        ))
+        
+        w("\n\nATP記錄間隔:")
+        for gap in system_cons['ru_gaps']:
+            w(f"\n- {gap['start']} 至 {gap['end']} (間隔{gap['duration']:.1f}秒)")
             
-            "\n事件對應分析:",
-            f"- 事件對應率: {event_corr['correlation_rate']:.1%}",
-            f"- 對應事件數: {len(event_corr['correlated_events'])}",
-            f"- 未配對ATP事件: {len(event_corr['unpaired_ru_events'])}",
-            f"- 未配對MMI事件: {len(event_corr['unpaired_mmi_events'])}",
+        w("\n\nMMI記錄間隔:")
+        for gap in system_cons['mmi_gaps']:
+            w(f"\n- {gap['start']} 至 {gap['end']} (間隔{gap['duration']:.1f}秒)")
             
-            "\n系統一致性分析:",
-            "時間覆蓋範圍:",
-            f"- ATP: {system_cons['time_coverage']['ru_start']} 至 {system_cons['time_coverage']['ru_end']}",
-            f"- MMI: {system_cons['time_coverage']['mmi_start']} 至 {system_cons['time_coverage']['mmi_end']}",
-            f"- 重疊時間: {system_cons['time_coverage']['overlap_start']} 至 {system_cons['time_coverage']['overlap_end']}",
+        w("\n\n狀態不一致:")
+        for inc in system_cons['state_inconsistencies']:
+            w(f"\n- {inc['time']}: {inc['description']}")
             
-            "\nATP記錄間隔:",
-            *[f"- {gap['start']} 至 {gap['end']} (間隔{gap['duration']:.1f}秒)"
-              for gap in system_cons['ru_gaps']],
-              
-            "\nMMI記錄間隔:",
-            *[f"- {gap['start']} 至 {gap['end']} (間隔{gap['duration']:.1f}秒)"
-              for gap in system_cons['mmi_gaps']],
-              
-            "\n狀態不一致:",
-            *[f"- {inc['time']}: {inc['description']}"
-              for inc in system_cons['state_inconsistencies']]
-        ]
-        return "\n".join(lines)
+        return buf.getvalue()
@@ -1,8 +1,12 @@
 # src/analyzer/exceptions.py
 
+from types import MappingProxyType
+
 class ATPAnalyzerError(Exception):
     """ATP分析器異常基礎類別"""
     
+    __slots__ = ('message', 'details')
+    
     def __init__(self, message: str = None, details: dict = None):
         self.message = message or "ATP分析器錯誤"
         self.details = details or {}
@@ -12,10 +16,16 @@ class ATPAnalyzerError(Exception):
         if self.details:
             return f"{self.message} - 詳細資訊: {self.details}"
         return self.message
+        
+    def __reduce__(self):
+        # 屬性存於__slots__, 需自行提供參數才能跨行程傳遞(pickle)
+        return (self.__class__, (self.message, self.details))
 
 class DataValidationError(ATPAnalyzerError):
     """資料驗證錯誤"""
     
+    __slots__ = ()
+    
     def __init__(self, message: str = None, details: dict = None):
         super().__init__(
             message or "資料驗證失敗",
@@ -25,6 +35,8 @@ class DataValidationError(ATPAnalyzerError):
 class ProcessingError(ATPAnalyzerError):
     """資料處理錯誤"""
     
+    __slots__ = ()
+    
     def __init__(self, message: str = None, details: dict = None):
         super().__init__(
             message or "資料處理失敗",
@@ -34,6 +46,8 @@ class ProcessingError(ATPAnalyzerError):
 class AnalysisError(ATPAnalyzerError):
     """分析過程錯誤"""
     
+    __slots__ = ()
+    
     def __init__(self, message: str = None, details: dict = None):
         super().__init__(
             message or "分析過程失敗",
@@ -43,6 +57,8 @@ class AnalysisError(ATPAnalyzerError):
 class ConfigError(ATPAnalyzerError):
     """配置錯誤"""
     
+    __slots__ = ()
+    
     def __init__(self, message: str = None, details: dict = None):
         super().__init__(
             message or "配置錯誤",
@@ -52,6 +68,8 @@ class ConfigError(ATPAnalyzerError):
 class FileError(ATPAnalyzerError):
     """檔案操作錯誤"""
     
+    __slots__ = ()
+    
     def __init__(self, message: str = None, details: dict = None):
         super().__init__(
             message or "檔案操作失敗",
@@ -61,6 +79,8 @@ class FileError(ATPAnalyzerError):
 class ExportError(ATPAnalyzerError):
     """匯出錯誤"""
     
+    __slots__ = ()
+    
     def __init__(self, message: str = None, details: dict = None):
         super().__init__(
             message or "匯出失敗",
@@ -70,6 +90,8 @@ class ExportError(ATPAnalyzerError):
 class TimeoutError(ATPAnalyzerError):
     """操作超時錯誤"""
     
+    __slots__ = ()
+    
     def __init__(self, message: str = None, details: dict = None):
         super().__init__(
             message or "操作超時",
@@ -79,6 +101,8 @@ class TimeoutError(ATPAnalyzerError):
 class MemoryError(ATPAnalyzerError):
     """記憶體錯誤"""
     
+    __slots__ = ()
+    
     def __init__(self, message: str = None, details: dict = None):
         super().__init__(
             message or "記憶體不足",
@@ -88,14 +112,16 @@ class MemoryError(ATPAnalyzerError):
 class ParallelProcessError(ATPAnalyzerError):
     """平行處理錯誤"""
     
+    __slots__ = ()
+    
     def __init__(self, message: str = None, details: dict = None):
         super().__init__(
             message or "平行處理失敗",
             details
         )
 
-# 異常代碼定義
-ERROR_CODES = {
+# 異常代碼定義(唯讀)
+ERROR_CODES = MappingProxyType({
     # 資料驗證錯誤 (1000-1999)
     1001: "記錄數量不足",
     1002: "缺少必要欄位",
@@ -132,7 +158,21 @@ ERROR_CODES = {
     5003: "平行處理失敗",
     5004: "系統資源不足",
     5005: "執行環境錯誤"
-}
+})
+
+# 錯誤代碼千位數 -> 異常類別, 以及個別代碼的例外對應
+_CLASS_BY_BAND = (
+    ATPAnalyzerError,      # 0-999
+    DataValidationError,   # 1000-1999
+    ProcessingError,       # 2000-2999
+    AnalysisError,         # 3000-3999
+    FileError              # 4000-4999
+)
+_CLASS_OVERRIDE = MappingProxyType({
+    5001: MemoryError,
+    5002: TimeoutError,
+    5003: ParallelProcessError
+})
 
 def get_error_message(code: int) -> str:
     """取得錯誤代碼對應的訊息"""
@@ -148,21 +188,9 @@ def create_error(code: int, **kwargs) -> ATPAnalyzerError:
     Returns:
         ATPAnalyzerError: 異常物件
     """
-    message = get_error_message(code)
-    
-    if 1000 <= code < 2000:
-        return DataValidationError(message, kwargs)
-    elif 2000 <= code < 3000:
-        return ProcessingError(message, kwargs)
-    elif 3000 <= code < 4000:
-        return AnalysisError(message, kwargs)
-    elif 4000 <= code < 5000:
-        return FileError(message, kwargs)
-    elif code == 5001:
-        return MemoryError(message, kwargs)
-    elif code == 5002:
-        return TimeoutError(message, kwargs)
-    elif code == 5003:
-        return ParallelProcessError(message, kwargs)
-    else:
-        return ATPAnalyzerError(message, kwargs)
+    band = code // 1000
+    error_class = _CLASS_OVERRIDE.get(code)
+    if error_class is None:
+        error_class = _CLASS_BY_BAND[band] if 0 <= band < len(_CLASS_BY_BAND) \
+                      else ATPAnalyzerError
+    return error_class(get_error_message(code), kwargs)
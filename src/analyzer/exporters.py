@@ -1,26 +1,41 @@
 # src/analyzer/exporters.py
 
+import csv
 import logging
 from pathlib import Path
-from typing import Dict, Any, List, Union, Optional
+from typing import Dict, Any, Iterable, List, Union, Optional, TYPE_CHECKING
 from datetime import datetime
-import pandas as pd
-import numpy as np
 import json
-import xlsxwriter
 from .exceptions import ExportError
-from .models import AnalysisResult, EventRecord, SpeedProfile
+from .models import AnalysisResult, EventRecord, SpeedProfile, _json_default
 from .utils import format_number, format_time
 
+if TYPE_CHECKING:
+    import xlsxwriter
+
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:  # 未安裝orjson時使用標準json模組
+    _HAS_ORJSON = False
+
 logger = logging.getLogger(__name__)
 
 class BaseExporter:
     """匯出器基礎類別"""
     
-    def __init__(self, output_dir: Union[str, Path]):
+    def __init__(self, output_dir: Union[str, Path],
+                 run_timestamp: Optional[str] = None):
+        """初始化匯出器
+        
+        Args:
+            output_dir: 輸出目錄
+            run_timestamp: 檔名時間戳記(可選), 多個匯出器共用時可確保檔名一致
+        """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+        self._run_timestamp = run_timestamp
         
     def export(self, result: AnalysisResult):
         """匯出分析結果"""
@@ -30,9 +45,16 @@ class BaseExporter:
         """確保目錄存在"""
         directory.mkdir(parents=True, exist_ok=True)
         
+    def begin_run(self) -> str:
+        """開始新的匯出批次, 重新取得時間戳記"""
+        self._run_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return self._run_timestamp
+        
     def _get_timestamp(self) -> str:
-        """取得時間戳記"""
-        return datetime.now().strftime("%Y%m%d_%H%M%S")
+        """取得時間戳記(首次呼叫時決定, 之後沿用)"""
+        if self._run_timestamp is None:
+            return self.begin_run()
+        return self._run_timestamp
 
 class ExcelExporter(BaseExporter):
     """Excel報表匯出器"""
@@ -48,16 +70,23 @@ class ExcelExporter(BaseExporter):
         Returns:
             Path: 匯出檔案路徑
         """
+        # 只在匯出Excel時才載入xlsxwriter
+        import xlsxwriter
+        
         try:
             if filename is None:
                 filename = f"ATP分析報告_{self._get_timestamp()}.xlsx"
                 
             filepath = self.output_dir / filename
             
-            # 建立Excel檔案
-            with xlsxwriter.Workbook(str(filepath)) as workbook:
-                # 設定格式
-                title_format = workbook.add_format({
+            # 建立Excel檔案(constant_memory: 逐列寫出, 各工作表須依列遞增寫入)
+            with xlsxwriter.Workbook(str(filepath), {
+                'constant_memory': True,
+                'strings_to_numbers': False
+            }) as workbook:
+                # 設定格式(相同設定在此活頁簿只建立一次)
+                formats = {}
+                title_format = self._fmt(workbook, formats, {
                     'bold': True,
                     'font_size': 14,
                     'align': 'center',
@@ -65,14 +94,14 @@ class ExcelExporter(BaseExporter):
                     'font_color': 'white'
                 })
                 
-                header_format = workbook.add_format({
+                header_format = self._fmt(workbook, formats, {
                     'bold': True,
                     'font_size': 11,
                     'align': 'center',
                     'bg_color': '#D0D8E8'
                 })
                 
-                cell_format = workbook.add_format({
+                cell_format = self._fmt(workbook, formats, {
                     'font_size': 11,
                     'align': 'center'
                 })
@@ -108,7 +137,24 @@ class ExcelExporter(BaseExporter):
             self.logger.error(f"匯出Excel報表失敗: {e}", exc_info=True)
             raise ExportError(f"匯出Excel報表失敗: {e}")
             
-    def _create_summary_sheet(self, workbook: xlsxwriter.Workbook,
+    def _fmt(self, workbook: 'xlsxwriter.Workbook', cache: Dict[tuple, Any],
+             spec: Dict[str, Any]):
+        """取得儲存格格式, 相同設定在同一活頁簿只建立一次
+        
+        Args:
+            workbook: Excel活頁簿
+            cache: 此活頁簿的格式快取(設定 -> 格式物件)
+            spec: 格式設定
+            
+        Returns:
+            Format: xlsxwriter格式物件
+        """
+        key = tuple(sorted(spec.items()))
+        if key not in cache:
+            cache[key] = workbook.add_format(spec)
+        return cache[key]
+        
+    def _create_summary_sheet(self, workbook: 'xlsxwriter.Workbook',
                             result: AnalysisResult,
                             title_format, header_format, cell_format):
         """建立摘要工作表"""
@@ -123,16 +169,14 @@ class ExcelExporter(BaseExporter):
         
         # 基本統計資料
         row = 2
-        worksheet.write(row, 0, '分析項目', header_format)
-        worksheet.write(row, 1, '數值', header_format)
+        worksheet.write_row(row, 0, ['分析項目', '數值'], header_format)
         
         stats = result.get_basic_stats()
-        for item, value in stats.items():
+        for item in stats.items():
             row += 1
-            worksheet.write(row, 0, item, cell_format)
-            worksheet.write(row, 1, value, cell_format)
+            worksheet.write_row(row, 0, item, cell_format)
             
-    def _create_speed_sheet(self, workbook: xlsxwriter.Workbook,
+    def _create_speed_sheet(self, workbook: 'xlsxwriter.Workbook',
                            result: AnalysisResult,
                            title_format, header_format, cell_format):
         """建立速度分析工作表"""
@@ -146,28 +190,24 @@ class ExcelExporter(BaseExporter):
         
         # 速度分布
         row = 2
-        worksheet.write(row, 0, '速度區間', header_format)
-        worksheet.write(row, 1, '次數', header_format)
+        worksheet.write_row(row, 0, ['速度區間', '次數'], header_format)
         
-        for interval, count in result.speed_stats['速度分布'].items():
+        for item in result.speed_stats['速度分布'].items():
             row += 1
-            worksheet.write(row, 0, interval, cell_format)
-            worksheet.write(row, 1, count, cell_format)
+            worksheet.write_row(row, 0, item, cell_format)
             
         # 加減速分析
         row += 2
         worksheet.merge_range(f'A{row}:B{row}', '加減速分析', title_format)
         
         row += 1
-        worksheet.write(row, 0, '分析項目', header_format)
-        worksheet.write(row, 1, '數值', header_format)
+        worksheet.write_row(row, 0, ['分析項目', '數值'], header_format)
         
-        for item, value in result.speed_stats['加減速分析'].items():
+        for item in result.speed_stats['加減速分析'].items():
             row += 1
-            worksheet.write(row, 0, item, cell_format)
-            worksheet.write(row, 1, value, cell_format)
+            worksheet.write_row(row, 0, item, cell_format)
             
-    def _create_event_sheet(self, workbook: xlsxwriter.Workbook,
+    def _create_event_sheet(self, workbook: 'xlsxwriter.Workbook',
                            result: AnalysisResult,
                            title_format, header_format, cell_format):
         """建立事件分析工作表"""
@@ -180,32 +220,30 @@ class ExcelExporter(BaseExporter):
         worksheet.merge_range('A1:B1', '事件統計', title_format)
         
         row = 2
-        worksheet.write(row, 0, '事件類型', header_format)
-        worksheet.write(row, 1, '發生次數', header_format)
+        worksheet.write_row(row, 0, ['事件類型', '發生次數'], header_format)
         
-        for event_type, count in result.event_stats['事件統計'].items():
+        for item in result.event_stats['事件統計'].items():
             row += 1
-            worksheet.write(row, 0, event_type, cell_format)
-            worksheet.write(row, 1, count, cell_format)
+            worksheet.write_row(row, 0, item, cell_format)
             
         # 重要事件列表
         row += 2
         worksheet.merge_range(f'A{row}:D{row}', '重要事件列表', title_format)
         
         row += 1
-        worksheet.write(row, 0, '時間', header_format)
-        worksheet.write(row, 1, '事件類型', header_format)
-        worksheet.write(row, 2, '位置', header_format)
-        worksheet.write(row, 3, '描述', header_format)
+        worksheet.write_row(row, 0, ['時間', '事件類型', '位置', '描述'], header_format)
         
-        for event in result.event_stats['重要事件']:
+        # 完整事件清單逐筆解析寫出(event_stats中的明細僅為報告預覽)
+        for event in result.event_details('重要事件'):
             row += 1
-            worksheet.write(row, 0, format_time(event['time']), cell_format)
-            worksheet.write(row, 1, event['type'], cell_format)
-            worksheet.write(row, 2, f"{event.get('location', 0):.3f}km", cell_format)
-            worksheet.write(row, 3, event.get('description', ''), cell_format)
+            worksheet.write_row(row, 0, [
+                format_time(event['time']),
+                event['type'],
+                f"{event.get('location', 0):.3f}km",
+                event.get('description', '')
+            ], cell_format)
             
-    def _create_location_sheet(self, workbook: xlsxwriter.Workbook,
+    def _create_location_sheet(self, workbook: 'xlsxwriter.Workbook',
                              result: AnalysisResult,
                              title_format, header_format, cell_format):
         """建立位置分析工作表"""
@@ -218,26 +256,22 @@ class ExcelExporter(BaseExporter):
         worksheet.merge_range('A1:B1', '站間運行時間', title_format)
         
         row = 2
-        worksheet.write(row, 0, '區間', header_format)
-        worksheet.write(row, 1, '時間', header_format)
+        worksheet.write_row(row, 0, ['區間', '時間'], header_format)
         
-        for section, time in result.location_stats['站間運行時間'].items():
+        for item in result.location_stats['站間運行時間'].items():
             row += 1
-            worksheet.write(row, 0, section, cell_format)
-            worksheet.write(row, 1, time, cell_format)
+            worksheet.write_row(row, 0, item, cell_format)
             
         # 位置分布
         row += 2
         worksheet.merge_range(f'A{row}:B{row}', '位置分布統計', title_format)
         
         row += 1
-        worksheet.write(row, 0, '位置區間', header_format)
-        worksheet.write(row, 1, '次數', header_format)
+        worksheet.write_row(row, 0, ['位置區間', '次數'], header_format)
         
-        for interval, count in result.location_stats['位置分布'].items():
+        for item in result.location_stats['位置分布'].items():
             row += 1
-            worksheet.write(row, 0, interval, cell_format)
-            worksheet.write(row, 1, count, cell_format)
+            worksheet.write_row(row, 0, item, cell_format)
 
 class CSVExporter(BaseExporter):
     """CSV報表匯出器"""
@@ -259,39 +293,27 @@ class CSVExporter(BaseExporter):
             exported_files = {}
             
             # 匯出基本統計
-            basic_stats = pd.DataFrame([
-                {'項目': k, '數值': v}
-                for k, v in result.get_basic_stats().items()
-            ])
             basic_stats_path = csv_dir / 'basic_stats.csv'
-            basic_stats.to_csv(basic_stats_path, index=False, encoding='utf-8')
+            self._write_csv(basic_stats_path, ['項目', '數值'],
+                            result.get_basic_stats().items())
             exported_files['basic_stats'] = basic_stats_path
             
             # 匯出速度分布
-            speed_dist = pd.DataFrame([
-                {'區間': k, '次數': v}
-                for k, v in result.speed_stats['速度分布'].items()
-            ])
             speed_dist_path = csv_dir / 'speed_distribution.csv'
-            speed_dist.to_csv(speed_dist_path, index=False, encoding='utf-8')
+            self._write_csv(speed_dist_path, ['區間', '次數'],
+                            result.speed_stats['速度分布'].items())
             exported_files['speed_distribution'] = speed_dist_path
             
             # 匯出事件統計
-            event_stats = pd.DataFrame([
-                {'事件類型': k, '次數': v}
-                for k, v in result.event_stats['事件統計'].items()
-            ])
             event_stats_path = csv_dir / 'event_stats.csv'
-            event_stats.to_csv(event_stats_path, index=False, encoding='utf-8')
+            self._write_csv(event_stats_path, ['事件類型', '次數'],
+                            result.event_stats['事件統計'].items())
             exported_files['event_stats'] = event_stats_path
             
             # 匯出位置統計
-            location_stats = pd.DataFrame([
-                {'區間': k, '運行時間': v}
-                for k, v in result.location_stats['站間運行時間'].items()
-            ])
             location_stats_path = csv_dir / 'location_stats.csv'
-            location_stats.to_csv(location_stats_path, index=False, encoding='utf-8')
+            self._write_csv(location_stats_path, ['區間', '運行時間'],
+                            result.location_stats['站間運行時間'].items())
             exported_files['location_stats'] = location_stats_path
             
             self.logger.info(f"CSV報表已匯出至: {csv_dir}")
@@ -300,6 +322,19 @@ class CSVExporter(BaseExporter):
         except Exception as e:
             self.logger.error(f"匯出CSV報表失敗: {e}", exc_info=True)
             raise ExportError(f"匯出CSV報表失敗: {e}")
+            
+    def _write_csv(self, path: Path, header: List[str], rows: Iterable):
+        """逐列寫出CSV檔案
+        
+        Args:
+            path: 檔案路徑
+            header: 標題列
+            rows: 資料列
+        """
+        with path.open('w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(header)
+            writer.writerows(rows)
 
 class JSONExporter(BaseExporter):
     """JSON報表匯出器"""
@@ -316,13 +351,21 @@ class JSONExporter(BaseExporter):
         try:
             filepath = self.output_dir / f"analysis_result_{self._get_timestamp()}.json"
             
-            with filepath.open('w', encoding='utf-8') as f:
-                json.dump(
+            if _HAS_ORJSON:
+                filepath.write_bytes(orjson.dumps(
                     result.to_dict(),
-                    f,
-                    ensure_ascii=False,
-                    indent=2
-                )
+                    default=_json_default,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+                ))
+            else:
+                with filepath.open('w', encoding='utf-8') as f:
+                    json.dump(
+                        result.to_dict(),
+                        f,
+                        ensure_ascii=False,
+                        indent=2,
+                        default=_json_default
+                    )
                 
             self.logger.info(f"JSON報表已匯出至: {filepath}")
             return filepath
@@ -331,12 +374,14 @@ class JSONExporter(BaseExporter):
             self.logger.error(f"匯出JSON報表失敗: {e}", exc_info=True)
             raise ExportError(f"匯出JSON報表失敗: {e}")
 
-def create_exporter(format_type: str, output_dir: Union[str, Path]) -> BaseExporter:
+def create_exporter(format_type: str, output_dir: Union[str, Path],
+                    run_timestamp: Optional[str] = None) -> BaseExporter:
     """建立匯出器實例
     
     Args:
         format_type: 匯出格式類型('excel'/'csv'/'json')
         output_dir: 輸出目錄
+        run_timestamp: 檔名時間戳記(可選)
         
     Returns:
         BaseExporter: 匯出器實例
@@ -351,4 +396,4 @@ def create_exporter(format_type: str, output_dir: Union[str, Path]) -> BaseExpor
     if not exporter_class:
         raise ValueError(f"不支援的匯出格式: {format_type}")
         
-    return exporter_class(output_dir)
+    return exporter_class(output_dir, run_timestamp)
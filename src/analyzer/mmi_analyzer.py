@@ -1,52 +1,116 @@
-from typing import List, Dict, Optional
+from collections.abc import Mapping
+from typing import Any, List, Dict, Optional
 import numpy as np
 from datetime import datetime
 from ..parsers.mmi_parser import MMIParser, MMIEventRecord, MMISpeedRecord
+from .utils import format_bin_labels
+
+class SpeedStats(Mapping):
+    """MMI速度統計結果(唯讀對應)
+    
+    各項統計於 analyze_speed 中即計算完成, 結果不保留速度與時間戳記陣列。
+    """
+    
+    def __init__(self, fields: Dict[str, Any]):
+        self._fields = dict(fields)
+        
+    def __getitem__(self, key: str) -> Any:
+        return self._fields[key]
+        
+    def __iter__(self):
+        return iter(self._fields)
+        
+    def __len__(self) -> int:
+        return len(self._fields)
+        
+    def __repr__(self) -> str:
+        return f"SpeedStats({dict(self)!r})"
 
 class MMIAnalyzer:
     """MMI資料分析器"""
     
+    # 加減速分析每次處理的速度筆數, 暫存陣列維持在快取大小內
+    BLOCK_SIZE = 65536
+    
     def __init__(self):
         self.speed_threshold = 90.0  # 速度閾值(km/h)
         
-    def analyze_speed(self, records: List[MMISpeedRecord]) -> Dict:
+    def analyze_speed(self, records: List[MMISpeedRecord]) -> SpeedStats:
         """分析速度記錄"""
         if not records:
-            return {}
+            return SpeedStats({})
             
-        speeds = [r.speed for r in records]
-        times = [r.timestamp for r in records]
-        
-        # 基本統計
-        stats = {
-            'max_speed': max(speeds),
-            'min_speed': min(speeds),
-            'avg_speed': np.mean(speeds),
-            'std_speed': np.std(speeds),
-            'over_speed_count': sum(1 for s in speeds if s > self.speed_threshold),
-            'total_time': (times[-1] - times[0]).total_seconds() / 3600  # 小時
-        }
+        # 單次迭代取出速度與時間戳記, 之後的統計皆在連續陣列上計算
+        n = len(records)
+        speeds = np.fromiter((r.speed for r in records), dtype=np.float64, count=n)
+        # 時間戳記直接轉為datetime64[us], 不逐筆呼叫 datetime.timestamp()
+        timestamps = np.fromiter(
+            (r.timestamp for r in records), dtype='datetime64[us]', count=n
+        )
+        
+        # 轉為陣列後各項統計皆為向量運算(耗時遠小於上方的逐筆迭代), 一次算完
+        avg_speed = speeds.sum() / n
+        return SpeedStats({
+            'max_speed': float(speeds.max()),
+            'min_speed': float(speeds.min()),
+            'avg_speed': avg_speed,
+            'std_speed': self._std_speed(speeds, avg_speed),
+            'over_speed_count': int((speeds > self.speed_threshold).sum()),
+            'total_time': (records[-1].timestamp - records[0].timestamp)
+                          .total_seconds() / 3600,  # 小時
+            'speed_distribution': self._speed_distribution(speeds),
+            'acceleration': self._analyze_acceleration(speeds, timestamps)
+        })
         
-        # 速度分布
+    def _std_speed(self, speeds: np.ndarray, avg_speed: float) -> float:
+        """計算速度標準差(以偏差向量的內積(BLAS)計算)"""
+        deviations = speeds - avg_speed
+        return np.sqrt(np.dot(deviations, deviations) / len(speeds))
+        
+    def _speed_distribution(self, speeds: np.ndarray) -> Dict[str, int]:
+        """計算速度分布(10個等寬區間)"""
         hist, bins = np.histogram(speeds, bins=10)
-        stats['speed_distribution'] = {
-            f"{bins[i]:.1f}-{bins[i+1]:.1f}": int(count)
-            for i, count in enumerate(hist)
-        }
+        return dict(zip(format_bin_labels(bins, '%.1f'), hist.tolist()))
         
-        # 加減速分析
-        dt = np.diff([t.timestamp() for t in times])
-        dv = np.diff(speeds)
-        accelerations = dv/dt
+    def _analyze_acceleration(self, speeds: np.ndarray,
+                              timestamps: np.ndarray) -> Dict:
+        """分段計算加減速統計
         
-        stats['acceleration'] = {
-            'max_acceleration': float(np.max(accelerations)),
-            'max_deceleration': float(np.min(accelerations)),
-            'avg_acceleration': float(np.mean(accelerations[accelerations > 0])),
-            'avg_deceleration': float(np.mean(accelerations[accelerations < 0]))
-        }
+        每段 BLOCK_SIZE 筆(相鄰段重疊一筆以銜接差分), 只累計極值與
+        正負加速度總和, 不建立完整長度的加速度陣列。
         
-        return stats
+        Args:
+            speeds: 速度陣列(km/h)
+            timestamps: 時間戳記陣列(datetime64[us])
+            
+        Returns:
+            Dict: 加減速統計
+        """
+        max_acc, min_acc = -np.inf, np.inf
+        pos_sum = neg_sum = 0.0
+        pos_count = neg_count = 0
+        
+        # 只有一筆記錄時仍執行一次, 與完整陣列相同地在空陣列取極值時報錯
+        for start in range(0, max(len(speeds) - 1, 1), self.BLOCK_SIZE):
+            stop = start + self.BLOCK_SIZE + 1
+            dt = np.diff(timestamps[start:stop]).astype(np.int64) / 1e6
+            accelerations = np.diff(speeds[start:stop]) / dt
+            
+            max_acc = np.maximum(max_acc, accelerations.max())
+            min_acc = np.minimum(min_acc, accelerations.min())
+            positive = accelerations > 0
+            negative = accelerations < 0
+            pos_sum += accelerations.sum(where=positive)
+            pos_count += np.count_nonzero(positive)
+            neg_sum += accelerations.sum(where=negative)
+            neg_count += np.count_nonzero(negative)
+            
+        return {
+            'max_acceleration': float(max_acc),
+            'max_deceleration': float(min_acc),
+            'avg_acceleration': float(pos_sum / pos_count) if pos_count else float('nan'),
+            'avg_deceleration': float(neg_sum / neg_count) if neg_count else float('nan')
+        }
         
     def analyze_events(self, records: List[MMIEventRecord]) -> Dict:
         """分析事件記錄"""
@@ -87,32 +151,29 @@ class MMIAnalyzer:
         
     def analyze_operation_modes(self, records: List[MMIEventRecord]) -> Dict:
         """分析運作模式變化"""
-        mode_changes = []
-        current_mode = None
-        mode_durations = {}
+        mode_events = [r for r in records
+                       if r.event_type == MMIParser.EVENT_MODE_CHANGE]
+        modes = [r.event_data[0] for r in mode_events]  # 假設第一個byte是模式代碼
         
-        for record in records:
-            if record.event_type == MMIParser.EVENT_MODE_CHANGE:
-                mode = record.event_data[0]  # 假設第一個byte是模式代碼
-                
-                if current_mode is not None:
-                    # 記錄模式變更
-                    mode_changes.append({
-                        'time': record.timestamp,
-                        'from': current_mode,
-                        'to': mode
-                    })
-                    
-                    # 計算持續時間
-                    if current_mode in mode_durations:
-                        mode_durations[current_mode] += \
-                            (record.timestamp - last_change).total_seconds()
-                    else:
-                        mode_durations[current_mode] = \
-                            (record.timestamp - last_change).total_seconds()
-                        
-                current_mode = mode
-                last_change = record.timestamp
+        # 記錄模式變更(第一筆之後的每次變更)
+        mode_changes = [
+            {'time': record.timestamp, 'from': from_mode, 'to': to_mode}
+            for record, from_mode, to_mode in zip(mode_events[1:], modes, modes[1:])
+        ]
+        
+        # 計算持續時間: 各模式的時間差以bincount一次累加
+        mode_durations = {}
+        if len(mode_events) > 1:
+            times = np.fromiter((r.timestamp for r in mode_events),
+                                dtype='datetime64[us]', count=len(mode_events))
+            deltas = np.diff(times).astype(np.int64) / 1e6
+            from_modes = np.asarray(modes[:-1], dtype=np.intp)
+            durations = np.bincount(from_modes, weights=deltas)
+            
+            # 依模式首次出現順序輸出
+            _, first = np.unique(from_modes, return_index=True)
+            for mode in from_modes[np.sort(first)].tolist():
+                mode_durations[mode] = float(durations[mode])
                 
         return {
             'mode_changes': mode_changes,
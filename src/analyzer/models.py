@@ -1,11 +1,71 @@
 # src/analyzer/models.py
 
 from dataclasses import dataclass, field
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Any
 import json
+import logging
+import sys
+import numpy as np
 
-@dataclass
+from .utils import format_timedelta
+
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:  # 未安裝orjson時使用標準json模組
+    _HAS_ORJSON = False
+
+logger = logging.getLogger(__name__)
+
+# Python 3.10起dataclass支援slots, 實例不再帶__dict__(3.9維持一般dataclass)
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+_EPOCH = datetime(1970, 1, 1)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+
+def _json_default(obj: Any) -> Any:
+    """轉換JSON無法直接序列化的型別"""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, timedelta):
+        return format_timedelta(obj)
+    if hasattr(obj, 'tolist'):  # numpy陣列與純量
+        return obj.tolist()
+    raise TypeError(f"無法序列化的型別: {type(obj).__name__}")
+
+def datetime_to_ns(value: datetime) -> int:
+    """將datetime轉換為自1970-01-01起的奈秒數(與datetime64[ns]相同)
+    
+    Args:
+        value: 時間戳記, 含時區時先轉為UTC
+        
+    Returns:
+        int: 奈秒數
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // _ONE_MICROSECOND * 1000
+
+def record_timestamp_ns(record: Any) -> int:
+    """取得記錄時間戳記的奈秒數
+    
+    analyzer.models.RURecord 建立時已換算 timestamp_ns; 其他來源的記錄
+    (如 ru_parser.ru_file.RURecord)沒有此欄位時由 timestamp 換算。
+    
+    Args:
+        record: ATP記錄
+        
+    Returns:
+        int: 奈秒數
+    """
+    try:
+        return record.timestamp_ns
+    except AttributeError:
+        return datetime_to_ns(record.timestamp)
+
+@dataclass(**_SLOTS)
 class RURecord:
     """ATP RU記錄資料結構"""
     log_type: int       # 記錄類型
@@ -13,7 +73,12 @@ class RURecord:
     location: float     # 位置(cm)
     speed: float       # 速度(cm/s)
     data: bytes        # 原始資料
+    timestamp_ns: int = field(init=False, repr=False, compare=False)  # 時間戳記(奈秒)
     
+    def __post_init__(self):
+        # 解析時即換算為整數奈秒, 分析時可直接組成datetime64[ns]陣列
+        self.timestamp_ns = datetime_to_ns(self.timestamp)
+        
     def to_dict(self) -> Dict[str, Any]:
         """轉換為字典格式"""
         return {
@@ -43,7 +108,127 @@ class RURecord:
             f"speed={self.speed/100:.1f}km/h)"
         )
 
-@dataclass
+# 原始整數單位換算係數
+SPEED_DIVISOR = 100.0       # 速度: 0.01 km/h -> km/h
+LOCATION_DIVISOR = 100000.0 # 位置: cm -> km
+
+@dataclass(**_SLOTS)
+class RecordArrays:
+    """ATP記錄欄式資料(struct-of-arrays), 供分析處理器使用
+    
+    速度與位置維持原始整數單位(int32), 只在計算平均值、加減速
+    或顯示時才除以 SPEED_DIVISOR / LOCATION_DIVISOR 轉為浮點數.
+    """
+    timestamp: np.ndarray     # 時間戳記(datetime64[ns])
+    log_type: np.ndarray      # 記錄類型
+    location: np.ndarray      # 位置(cm, int32)
+    speed: np.ndarray         # 速度(0.01 km/h, int32)
+    data0: np.ndarray         # 原始資料首位元組(int16, 無資料時為-1)
+    station_code: np.ndarray  # 站點代碼(僅PRS事件, object)
+    data: np.ndarray          # 原始資料(object)
+    
+    @classmethod
+    def from_records(cls, records: List[RURecord]) -> 'RecordArrays':
+        """將記錄列表轉換為欄式陣列
+        
+        Args:
+            records: ATP記錄列表
+            
+        Returns:
+            RecordArrays: 記錄欄式資料
+        """
+        n = len(records)
+        log_types = np.fromiter((r.log_type for r in records), dtype=np.int16, count=n)
+        speeds_raw = np.fromiter((r.speed for r in records), dtype=np.int32, count=n)
+        locations_raw = np.fromiter((r.location for r in records), dtype=np.int32, count=n)
+        timestamps = np.fromiter(
+            (record_timestamp_ns(r) for r in records), dtype=np.int64, count=n
+        ).view('datetime64[ns]')
+        # 原始資料首位元組(狀態碼), 無資料時以-1表示
+        data0 = np.fromiter(
+            (r.data[0] if r.data else -1 for r in records),
+            dtype=np.int16, count=n
+        )
+        # 站點代碼, 只解碼PRS事件(type 91)的資料
+        station_codes = np.empty(n, dtype=object)
+        for i in np.flatnonzero(log_types == 91):
+            try:
+                station_codes[i] = records[i].data.decode('ascii').strip()
+            except UnicodeDecodeError as e:
+                logger.warning(f"站點資料解析失敗: {e}")
+        
+        # 原始資料維持object陣列, 單次迴圈填入
+        data = np.empty(n, dtype=object)
+        for i, record in enumerate(records):
+            data[i] = record.data
+        
+        return cls(
+            timestamp=timestamps,
+            log_type=log_types,
+            location=locations_raw,  # 原始單位cm
+            speed=speeds_raw,  # 原始單位0.01 km/h
+            data0=data0,
+            station_code=station_codes,
+            data=data
+        )
+        
+    def __len__(self) -> int:
+        return len(self.log_type)
+        
+    def datetime_at(self, index: int) -> datetime:
+        """取得指定記錄的時間戳記(datetime)"""
+        return self.timestamp[index].astype('datetime64[us]').item()
+
+@dataclass(**_SLOTS)
+class EventColumns:
+    """事件記錄欄式資料, 保留全部事件供匯出時逐筆解析成明細
+    
+    只保存解析事件所需的欄位, 不依賴分析時的完整記錄陣列。
+    """
+    timestamp: np.ndarray     # 時間戳記(datetime64[ns])
+    log_type: np.ndarray      # 記錄類型
+    data0: np.ndarray         # 原始資料首位元組(無資料時為-1)
+        
+    @classmethod
+    def take(cls, records: RecordArrays, indices: np.ndarray) -> 'EventColumns':
+        """取出指定記錄的事件欄位
+        
+        Args:
+            records: 記錄欄式資料
+            indices: 事件記錄索引
+        
+        Returns:
+            EventColumns: 事件欄式資料
+        """
+        return cls(
+            timestamp=records.timestamp[indices],
+            log_type=records.log_type[indices],
+            data0=records.data0[indices]
+        )
+        
+    @classmethod
+    def concat(cls, chunks: List['EventColumns']) -> 'EventColumns':
+        """依序合併多批事件欄式資料"""
+        if not chunks:
+            return cls(
+                timestamp=np.empty(0, dtype='datetime64[ns]'),
+                log_type=np.empty(0, dtype=np.int16),
+                data0=np.empty(0, dtype=np.int16)
+            )
+        return cls(
+            timestamp=np.concatenate([c.timestamp for c in chunks]),
+            log_type=np.concatenate([c.log_type for c in chunks]),
+            data0=np.concatenate([c.data0 for c in chunks])
+        )
+        
+    def __len__(self) -> int:
+        return len(self.log_type)
+        
+    def datetime_at(self, index: int) -> datetime:
+        """取得指定事件的時間戳記(datetime)"""
+        return self.timestamp[index].astype('datetime64[us]').item()
+
+@dataclass(**_SLOTS)
 class SpeedProfile:
     """速度剖面資料"""
     timestamps: List[datetime]           # 時間序列
@@ -58,9 +243,10 @@ class SpeedProfile:
         if not self.speeds:
             return
             
-        self.max_speed = max(self.speeds)
-        self.avg_speed = sum(self.speeds) / len(self.speeds)
-        self.over_speed_count = sum(1 for s in self.speeds if s > speed_threshold)
+        speeds = np.asarray(self.speeds, dtype=np.float64)
+        self.max_speed = float(speeds.max())
+        self.avg_speed = float(speeds.mean())
+        self.over_speed_count = int(np.count_nonzero(speeds > speed_threshold))
         
     def to_dict(self) -> Dict[str, Any]:
         """轉換為字典格式"""
@@ -73,7 +259,7 @@ class SpeedProfile:
             'over_speed_count': self.over_speed_count
         }
 
-@dataclass
+@dataclass(**_SLOTS)
 class EventRecord:
     """事件記錄資料"""
     event_type: str           # 事件類型
@@ -106,7 +292,7 @@ class EventRecord:
             data=data['data']
         )
 
-@dataclass
+@dataclass(**_SLOTS)
 class StationRecord:
     """車站記錄資料"""
     station_id: str          # 車站代碼
@@ -132,7 +318,10 @@ class StationRecord:
             'platform': self.platform
         }
 
-@dataclass
+# 事件明細名稱 -> event_stats 中對應的完整事件欄式資料
+_EVENT_COLUMN_KEYS = {'重要事件': 'important_events', '異常事件': 'abnormal_events'}
+
+@dataclass(**_SLOTS)
 class AnalysisResult:
     """分析結果資料"""
     max_speed: float                # 最高速度(km/h)
@@ -152,24 +341,56 @@ class AnalysisResult:
             '最高速度': f"{self.max_speed:.1f} km/h",
             '平均速度': f"{self.avg_speed:.1f} km/h",
             '總距離': f"{self.total_distance:.1f} km",
-            '總時間': str(self.total_time),
+            '總時間': format_timedelta(self.total_time),
             '超速次數': self.over_speed_count,
             '緊急煞車次數': self.emergency_brake_count,
             'ATP關機次數': self.atp_down_count
         }
         
+    def event_details(self, name: str) -> Iterable[Dict[str, Any]]:
+        """取得完整事件明細, 供匯出時逐筆寫出
+        
+        event_stats 中的明細最多 max_details 筆(報告預覽用),
+        完整清單由事件欄式資料逐筆解析。
+        
+        Args:
+            name: 明細名稱('重要事件'/'異常事件')
+        
+        Returns:
+            Iterable[Dict]: 事件明細
+        """
+        events = self.event_stats.get(_EVENT_COLUMN_KEYS[name])
+        if events is None:  # 由字典還原的結果已是完整清單
+            return self.event_stats.get(name, [])
+        from .processors import iter_event_details
+        return iter_event_details(events)
+        
     def to_dict(self) -> Dict[str, Any]:
-        """轉換為字典格式"""
+        """轉換為字典格式(事件明細為完整清單)"""
+        event_stats = {
+            key: value for key, value in self.event_stats.items()
+            if key not in _EVENT_COLUMN_KEYS.values()
+        }
+        for name in _EVENT_COLUMN_KEYS:
+            if name in event_stats:
+                event_stats[name] = list(self.event_details(name))
         return {
             'basic_stats': self.get_basic_stats(),
             'speed_stats': self.speed_stats,
             'location_stats': self.location_stats,
-            'event_stats': self.event_stats
+            'event_stats': event_stats
         }
         
     def to_json(self) -> str:
         """轉換為JSON格式"""
-        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+        if _HAS_ORJSON:
+            return orjson.dumps(
+                self.to_dict(),
+                default=_json_default,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+            ).decode('utf-8')
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2,
+                          default=_json_default)
         
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'AnalysisResult':
@@ -187,11 +408,12 @@ class AnalysisResult:
             event_stats=data['event_stats']
         )
 
-@dataclass
+@dataclass(**_SLOTS)
 class AnalysisConfig:
     """分析器配置資料"""
     chunk_size: int = 1000           # 分批大小
     speed_threshold: float = 90.0    # 速度閾值(km/h)
+    max_details: int = 50            # 事件明細最多筆數
     cache_enabled: bool = True       # 啟用快取
     parallel_enabled: bool = True    # 啟用平行處理
     log_level: str = 'INFO'         # 日誌等級
@@ -201,6 +423,7 @@ class AnalysisConfig:
         return {
             'chunk_size': self.chunk_size,
             'speed_threshold': self.speed_threshold,
+            'max_details': self.max_details,
             'cache_enabled': self.cache_enabled,
             'parallel_enabled': self.parallel_enabled,
             'log_level': self.log_level
@@ -231,8 +454,12 @@ def convert_location(location_cm: float) -> float:
     """將位置從cm轉換為km"""
     return location_cm / 100000.0
 
+@lru_cache(maxsize=8192)
 def parse_timestamp(timestamp_str: str) -> datetime:
-    """解析時間戳記字串"""
+    """解析時間戳記字串
+    
+    同一秒的記錄常帶有相同的時間字串, 解析結果(datetime不可變)以LRU快取保留。
+    """
     try:
         return datetime.fromisoformat(timestamp_str)
     except ValueError:
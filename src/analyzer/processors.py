@@ -1,15 +1,85 @@
 # src/analyzer/processors.py
 
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Iterator, Optional, List
 import numpy as np
-import pandas as pd
 from datetime import datetime, timedelta
 
 from .exceptions import ProcessingError
+from .models import RecordArrays, EventColumns, SPEED_DIVISOR, LOCATION_DIVISOR
+from .utils import format_bin_labels
+
+try:
+    from ._kernels import _analyze_numeric_numba, _classify_events
+    _HAS_NUMBA = True
+except ImportError:  # numba為選用套件(pip install atp-analyzer[fast])
+    _HAS_NUMBA = False
 
 logger = logging.getLogger(__name__)
 
+# 事件記錄類型查表(log_type為小範圍整數, 以查表取代逐筆成員判斷)
+_EVENT_LUT = np.zeros(1024, dtype=bool)
+_EVENT_LUT[[2, 3, 91, 201]] = True
+
+# 事件類型 -> 計數陣列索引(非事件為-1), 與 _EVENT_NAMES 順序對應
+_EVT_IDX = np.full(len(_EVENT_LUT), -1, dtype=np.int8)
+_EVT_IDX[[2, 3, 91, 201]] = [0, 1, 2, 3]
+_EVENT_NAMES = ('ATP狀態變更', 'MMI狀態變更', 'PRS事件', 'ATP關機')
+
+# 各事件類型視為異常的狀態碼(資料首位元組)
+_ABNORMAL_CODES = {
+    2: (2, 3, 4),   # 緊急煞車、故障、異常
+    3: (1, 2, 3),   # 顯示異常、按鍵故障、記憶體不足
+    91: (3, 4, 5)   # CRC錯誤、編號不符、通訊逾時
+}
+
+# 狀態碼描述, 以狀態碼為索引
+_ATP_STATUS = ("正常", "常用緊軔", "緊急緊軔", "系統故障", "通訊異常", "感應子異常")
+_MMI_STATUS = ("正常", "顯示異常", "按鍵故障", "記憶體不足", "通訊中斷", "系統重啟")
+_PRS_EVENTS = ("通訊正常", "列車編號設定", "CRC錯誤", "通訊逾時",
+               "編號不符", "連線中斷", "連線恢復")
+
+# [事件索引, 狀態碼] -> 是否為異常(ATP關機不列入異常判定;
+# 無資料的狀態碼-1對應最後一欄, 恆為False)
+_ABNORMAL_LUT = np.zeros((len(_EVENT_NAMES), 256), dtype=bool)
+for _log_type, _codes in _ABNORMAL_CODES.items():
+    _ABNORMAL_LUT[_EVT_IDX[_log_type], list(_codes)] = True
+
+def _describe(names: tuple, code: Optional[int], unknown: str) -> str:
+    """以狀態碼查詢描述
+    
+    Args:
+        names: 以狀態碼為索引的描述
+        code: 狀態碼(無資料時為None)
+        unknown: 未定義狀態碼的描述前綴
+        
+    Returns:
+        str: 狀態描述
+    """
+    if code is not None and 0 <= code < len(names):
+        return names[code]
+    return f"{unknown}({code})"
+
+def _uniform_hist(x: np.ndarray, bin_width: int, nbins: int) -> np.ndarray:
+    """計算自0起算的等寬直方圖次數
+    
+    等寬區間可直接以整數除法算出區間索引, 不需對邊界做二分搜尋。
+    區間規則與np.histogram相同: 最後一個區間包含右端點,
+    超出範圍的值不列入計算。
+    
+    Args:
+        x: 整數資料陣列
+        bin_width: 區間寬度
+        nbins: 區間數
+        
+    Returns:
+        np.ndarray: 各區間次數
+    """
+    upper = bin_width * nbins
+    x = x[(x >= 0) & (x <= upper)]
+    idx = np.minimum(x // bin_width, nbins - 1)
+    return np.bincount(idx, minlength=nbins)
+
 class BaseProcessor:
     """處理器基礎類別"""
     
@@ -23,17 +93,36 @@ class BaseProcessor:
             progress = int(current * 100 / total)
             callback(progress)
             
+    def begin(self, **kwargs):
+        """開始新的分批分析, 重設累計狀態"""
+        raise NotImplementedError
+        
+    def update(self, records: RecordArrays):
+        """累計一批記錄的分析結果"""
+        raise NotImplementedError
+        
+    def finish(self) -> Dict[str, Any]:
+        """結束分批分析並回傳結果"""
+        raise NotImplementedError
+        
 class SpeedProcessor(BaseProcessor):
     """速度資料處理器"""
     
-    def analyze(self, df: pd.DataFrame,
+    # 速度分布區間(km/h)
+    SPEED_BINS = [0, 20, 40, 60, 80, 100, 120]
+    # 同一區間的原始整數單位(0.01 km/h), 等寬以便numba路徑直接計算區間
+    SPEED_BINS_RAW = np.array(SPEED_BINS, dtype=np.int32) * 100
+    # 區間標籤固定, 定義時格式化一次
+    SPEED_LABELS = tuple(format_bin_labels(SPEED_BINS, '%d', 'km/h'))
+    
+    def analyze(self, records: RecordArrays,
                threshold: float = 90.0,
                chunk_size: int = 1000,
                callback: Optional[callable] = None) -> Dict[str, Any]:
         """分析速度特性
         
         Args:
-            df: 記錄DataFrame
+            records: 記錄欄式資料
             threshold: 速度閾值(km/h)
             chunk_size: 分批大小
             callback: 進度回調函數
@@ -41,155 +130,379 @@ class SpeedProcessor(BaseProcessor):
         Returns:
             Dict: 速度分析結果
         """
+        self.begin(threshold=threshold)
+        self.update(records)
+        return self.finish()
+        
+    def begin(self, threshold: float = 90.0):
+        """開始新的分批分析
+        
+        Args:
+            threshold: 速度閾值(km/h)
+        """
+        # 閾值換算為原始整數單位, 速度 > threshold 等同 speed_raw > floor(threshold*100)
+        self._threshold_raw = int(np.floor(round(threshold * 100, 6)))
+        self._count = 0
+        self._mean = 0.0
+        self._max_speed = None
+        self._over_speed_count = 0
+        self._hist = np.zeros(len(self.SPEED_BINS) - 1, dtype=np.int64)
+        
+        # 加減速累計值, 並保留上一批最後一筆速度記錄以銜接差分
+        self._last_speed = None
+        self._last_time_ns = None
+        self._acc_count = 0
+        self._acc_max = -np.inf
+        self._acc_min = np.inf
+        self._acc_pos_sum = 0.0
+        self._acc_pos_count = 0
+        self._acc_neg_sum = 0.0
+        self._acc_neg_count = 0
+        
+    def update(self, records: RecordArrays):
+        """累計一批記錄的速度統計
+        
+        Args:
+            records: 記錄欄式資料
+        """
         try:
             # 篩選速度記錄
-            speed_df = df[df['log_type'] == 211].copy()
-            
-            if speed_df.empty:
-                raise ProcessingError("找不到速度記錄")
+            mask211 = records.log_type == 211
+            if not mask211.any():
+                return
                 
-            # 基本統計
-            stats = {
-                'max_speed': speed_df['speed'].max(),
-                'avg_speed': speed_df['speed'].mean(),
-                'over_speed_count': len(speed_df[speed_df['speed'] > threshold])
-            }
+            speed_series = records.speed[mask211]
+            timestamps_ns = records.timestamp[mask211].view(np.int64)
             
-            # 速度分布
-            bins = [0, 20, 40, 60, 80, 100, 120]
-            hist, _ = np.histogram(speed_df['speed'], bins=bins)
-            stats['速度分布'] = {
-                f"{bins[i]}-{bins[i+1]}km/h": int(count)
-                for i, count in enumerate(hist)
-            }
+            # 基本統計與速度分布
+            batch_count = speed_series.size
+            if _HAS_NUMBA:
+                total, batch_max, over_count, hist = _analyze_numeric_numba(
+                    speed_series, self._threshold_raw,
+                    self.SPEED_BINS_RAW[1] - self.SPEED_BINS_RAW[0],
+                    len(self.SPEED_BINS_RAW) - 1
+                )
+                batch_mean = total / batch_count
+            else:
+                batch_mean = speed_series.mean()
+                batch_max = speed_series.max()
+                over_count = (speed_series > self._threshold_raw).sum()
+                hist = _uniform_hist(
+                    speed_series,
+                    self.SPEED_BINS_RAW[1] - self.SPEED_BINS_RAW[0],
+                    len(self.SPEED_BINS_RAW) - 1
+                )
+                
+            # 以合併平均值的Welford形式累計
+            self._count += batch_count
+            self._mean += (batch_mean - self._mean) * batch_count / self._count
+            if self._max_speed is None or batch_max > self._max_speed:
+                self._max_speed = int(batch_max)
+            self._over_speed_count += int(over_count)
+            self._hist += hist
             
             # 加減速分析
-            speed_arr = speed_df['speed'].values
-            time_arr = speed_df['timestamp'].astype(np.int64) // 10**9
-            
-            time_diffs = np.diff(time_arr)
-            speed_diffs = np.diff(speed_arr)
-            
-            # 避免除以零
-            mask = time_diffs > 0
-            accelerations = np.zeros_like(time_diffs)
-            accelerations[mask] = speed_diffs[mask] / time_diffs[mask]
-            
-            stats['加減速分析'] = {
-                '最大加速度': f"{np.max(accelerations):.2f} km/h/s",
-                '最大減速度': f"{abs(np.min(accelerations)):.2f} km/h/s",
-                '平均加速度': f"{np.mean(accelerations[accelerations > 0]):.2f} km/h/s",
-                '平均減速度': f"{abs(np.mean(accelerations[accelerations < 0])):.2f} km/h/s"
-            }
-            
-            return stats
+            if self._last_speed is not None:
+                speed_series = np.concatenate(([self._last_speed], speed_series))
+                timestamps_ns = np.concatenate(([self._last_time_ns], timestamps_ns))
+            self._accumulate_acceleration(speed_series, timestamps_ns)
+            self._last_speed = speed_series[-1]
+            self._last_time_ns = timestamps_ns[-1]
             
         except Exception as e:
             self.logger.error(f"速度分析失敗: {e}", exc_info=True)
             raise ProcessingError(f"速度分析失敗: {e}")
+            
+    def finish(self) -> Dict[str, Any]:
+        """結束分批分析
+        
+        Returns:
+            Dict: 速度分析結果
+        """
+        if self._count == 0:
+            self.logger.error("速度分析失敗: 找不到速度記錄")
+            raise ProcessingError("速度分析失敗: 找不到速度記錄")
+            
+        stats = {
+            'max_speed': self._max_speed / SPEED_DIVISOR,
+            'avg_speed': float(self._mean) / SPEED_DIVISOR,
+            'over_speed_count': self._over_speed_count,
+            '速度分布': dict(zip(self.SPEED_LABELS, self._hist.tolist()))
+        }
+        
+        if self._acc_count:
+            max_acc, min_acc = self._acc_max, self._acc_min
+        else:
+            max_acc = min_acc = 0.0
+        avg_acc = self._acc_pos_sum / self._acc_pos_count if self._acc_pos_count else 0.0
+        avg_dec = self._acc_neg_sum / self._acc_neg_count if self._acc_neg_count else 0.0
+        
+        stats['加減速分析'] = {
+            '最大加速度': f"{max_acc:.2f} km/h/s",
+            '最大減速度': f"{abs(min_acc):.2f} km/h/s",
+            '平均加速度': f"{avg_acc:.2f} km/h/s",
+            '平均減速度': f"{abs(avg_dec):.2f} km/h/s"
+        }
+        
+        return stats
+        
+    def _accumulate_acceleration(self, speeds: np.ndarray,
+                                 timestamps_ns: np.ndarray):
+        """累計加減速特性
+        
+        Args:
+            speeds: 速度陣列(0.01 km/h)
+            timestamps_ns: 時間戳記陣列(奈秒)
+        """
+        dt = np.diff(timestamps_ns).astype(np.float64) * 1e-9
+        ds = np.diff(speeds).astype(np.float64) / SPEED_DIVISOR
+        if ds.size == 0:
+            return
+            
+        # 避免除以零
+        accelerations = np.divide(ds, dt, out=np.zeros_like(ds), where=dt > 0)
+        
+        # 以where直接在遮罩上累加, 不另外複製正/負值子陣列
+        positive = accelerations > 0
+        negative = accelerations < 0
+        
+        self._acc_count += accelerations.size
+        self._acc_max = max(self._acc_max, float(accelerations.max()))
+        self._acc_min = min(self._acc_min, float(accelerations.min()))
+        self._acc_pos_sum += float(accelerations.sum(where=positive))
+        self._acc_pos_count += int(np.count_nonzero(positive))
+        self._acc_neg_sum += float(accelerations.sum(where=negative))
+        self._acc_neg_count += int(np.count_nonzero(negative))
 
 class EventProcessor(BaseProcessor):
     """事件資料處理器"""
     
-    def analyze(self, df: pd.DataFrame,
+    # 事件記錄類型與對應名稱(依輸出順序)
+    EVENT_TYPES = dict(zip((2, 3, 91, 201), _EVENT_NAMES))
+    
+    def __init__(self, max_details: int = 50):
+        """初始化事件處理器
+        
+        Args:
+            max_details: 重要事件/異常事件明細最多保留筆數(報告預覽),
+                完整清單保留為結果中的事件欄式資料
+        """
+        super().__init__()
+        self.max_details = max_details
+        
+    def analyze(self, records: RecordArrays,
                callback: Optional[callable] = None) -> Dict[str, Any]:
         """分析事件記錄
         
         Args:
-            df: 記錄DataFrame
+            records: 記錄欄式資料
             callback: 進度回調函數
             
         Returns:
             Dict: 事件分析結果
         """
+        self.begin()
+        self.update(records, callback=callback)
+        return self.finish()
+        
+    def begin(self):
+        """開始新的分批分析"""
+        self._counts = np.zeros(len(_EVENT_NAMES), dtype=np.int64)
+        self._emergency_chunks = []
+        self._emergency_events = []
+        self._atp_down_chunks = []
+        self._atp_down_events = []
+        self._abnormal_chunks = {log_type: [] for log_type in _ABNORMAL_CODES}
+        self._abnormal_events = {log_type: [] for log_type in _ABNORMAL_CODES}
+        
+    def update(self, records: RecordArrays,
+               callback: Optional[callable] = None):
+        """累計一批記錄的事件統計
+        
+        計數與記錄索引以遮罩一次取得, 只有前 max_details 筆會解析成明細。
+        
+        Args:
+            records: 記錄欄式資料
+            callback: 進度回調函數
+        """
         try:
-            # 事件統計
-            event_counts = {}
-            emergency_brake_count = 0
-            atp_down_count = 0
-            important_events = []
-            abnormal_events = []
+            if _HAS_NUMBA:
+                em_idx, atp_down_idx, abnormal_idx = self._classify_numba(records)
+            else:
+                em_idx, atp_down_idx, abnormal_idx = self._classify(records)
+            self._collect(records, em_idx, self._emergency_chunks,
+                          self._emergency_events)
             
             # 處理每種事件類型
-            for log_type in [2, 3, 91, 201]:
-                events = df[df['log_type'] == log_type]
-                
+            for log_type in self.EVENT_TYPES:
                 # 更新進度
                 self._update_progress(log_type, 201, callback)
                 
-                for _, event in events.iterrows():
-                    event_info = self._parse_event(event)
-                    
-                    if event_info:
-                        # 更新計數
-                        event_type = event_info['type']
-                        event_counts[event_type] = event_counts.get(event_type, 0) + 1
-                        
-                        # 檢查特殊事件
-                        if event_info.get('is_emergency'):
-                            emergency_brake_count += 1
-                            important_events.append(event_info)
-                        if event_info.get('is_atp_down'):
-                            atp_down_count += 1
-                            important_events.append(event_info)
-                        if event_info.get('is_abnormal'):
-                            abnormal_events.append(event_info)
-            
-            return {
-                'event_counts': event_counts,
-                'emergency_brake_count': emergency_brake_count,
-                'atp_down_count': atp_down_count,
-                '事件統計': event_counts,
-                '重要事件': important_events,
-                '異常事件': abnormal_events
-            }
+                if log_type == 201:
+                    self._collect(records, atp_down_idx,
+                                  self._atp_down_chunks, self._atp_down_events)
+                else:
+                    self._collect(records, abnormal_idx[log_type],
+                                  self._abnormal_chunks[log_type],
+                                  self._abnormal_events[log_type])
             
         except Exception as e:
             self.logger.error(f"事件分析失敗: {e}", exc_info=True)
             raise ProcessingError(f"事件分析失敗: {e}")
             
-    def _parse_event(self, event) -> Optional[Dict[str, Any]]:
-        """解析事件資訊"""
+    def _classify(self, records: RecordArrays):
+        """以NumPy遮罩分類事件記錄並累計各類型事件數
+        
+        Args:
+            records: 記錄欄式資料
+            
+        Returns:
+            Tuple: (緊急煞車索引, ATP關機索引, 各類型異常事件索引)
+        """
+        # 先以查表篩出事件記錄, 之後只在事件子集上分類
+        # (超出查表範圍的類型以clip對應到非事件項目)
+        event_idx = np.flatnonzero(
+            np.take(_EVENT_LUT, records.log_type, mode='clip')
+        )
+        event_types = records.log_type[event_idx]
+        event_codes = records.data0[event_idx]
+        event_kinds = _EVT_IDX[event_types]
+        
+        # 各類型事件數以索引陣列一次累計
+        self._counts += np.bincount(event_kinds, minlength=len(_EVENT_NAMES))
+        
+        # 緊急煞車: ATP狀態事件且狀態碼為2
+        em_idx = event_idx[(event_types == 2) & (event_codes == 2)]
+        atp_down_idx = event_idx[event_types == 201]
+        
+        # 異常判定以(類型, 狀態碼)查表一次完成, 再依類型穩定排序後切分
+        abnormal = _ABNORMAL_LUT[event_kinds, event_codes]
+        abnormal_kinds = event_kinds[abnormal]
+        order = np.argsort(abnormal_kinds, kind='stable')
+        sizes = np.bincount(abnormal_kinds, minlength=len(_ABNORMAL_CODES))
+        bounds = np.cumsum(sizes)[:len(_ABNORMAL_CODES) - 1]
+        abnormal_idx = dict(zip(
+            _ABNORMAL_CODES, np.split(event_idx[abnormal][order], bounds)
+        ))
+        return em_idx, atp_down_idx, abnormal_idx
+        
+    def _classify_numba(self, records: RecordArrays):
+        """以numba核心單次迴圈分類事件記錄並累計各類型事件數
+        
+        Args:
+            records: 記錄欄式資料
+            
+        Returns:
+            Tuple: (緊急煞車索引, ATP關機索引, 各類型異常事件索引)
+        """
+        counts, em_idx, atp_down_idx, abnormal, abnormal_n = _classify_events(
+            records.log_type, records.data0, _EVT_IDX, len(_EVENT_NAMES),
+            _ABNORMAL_LUT
+        )
+        self._counts += counts
+        abnormal_idx = {
+            log_type: abnormal[_EVT_IDX[log_type], :abnormal_n[_EVT_IDX[log_type]]]
+            for log_type in _ABNORMAL_CODES
+        }
+        return em_idx, atp_down_idx, abnormal_idx
+        
+    def _collect(self, records: RecordArrays, indices: np.ndarray,
+                 event_chunks: List[EventColumns], events: List[Dict[str, Any]]):
+        """保留事件欄位, 並解析尚未達上限的明細
+        
+        Args:
+            records: 記錄欄式資料
+            indices: 本批事件的記錄索引
+            event_chunks: 累計的事件欄式資料
+            events: 累計的事件明細
+        """
+        event_chunks.append(EventColumns.take(records, indices))
+        for idx in indices[:max(self.max_details - len(events), 0)]:
+            event_info = self._parse_event(records, idx)
+            if event_info:
+                events.append(event_info)
+                
+    def finish(self) -> Dict[str, Any]:
+        """結束分批分析
+        
+        Returns:
+            Dict: 事件分析結果, 重要事件/異常事件明細最多 max_details 筆,
+                important_events / abnormal_events 為對應的完整事件欄式資料,
+                供匯出時以 iter_event_details 逐筆解析
+        """
+        event_counts = {
+            name: count
+            for name, count in zip(_EVENT_NAMES, self._counts.tolist()) if count
+        }
+        abnormal_events = [
+            event for events in self._abnormal_events.values() for event in events
+        ]
+        
+        return {
+            'event_counts': event_counts,
+            'emergency_brake_count': int(sum(len(c) for c in self._emergency_chunks)),
+            'atp_down_count': int(self._counts[_EVT_IDX[201]]),
+            '事件統計': event_counts,
+            '重要事件': (self._emergency_events + self._atp_down_events)[:self.max_details],
+            '異常事件': abnormal_events[:self.max_details],
+            'important_events': EventColumns.concat(
+                self._emergency_chunks + self._atp_down_chunks
+            ),
+            'abnormal_events': EventColumns.concat(
+                [c for chunks in self._abnormal_chunks.values() for c in chunks]
+            )
+        }
+            
+    def _parse_event(self, records: RecordArrays,
+                     index: int) -> Optional[Dict[str, Any]]:
+        """解析事件資訊
+        
+        Args:
+            records: 記錄欄式資料或事件欄式資料(EventColumns)
+            index: 記錄索引
+            
+        Returns:
+            Optional[Dict]: 事件明細, 非事件或解析失敗時為None
+        """
         try:
-            if event['log_type'] == 2:  # ATP狀態
-                data = event['data']
-                status_code = data[0] if len(data) > 0 else None
+            log_type = records.log_type[index]
+            # 狀態碼取自預先擷取的資料首位元組, 無資料時為None
+            status_code = int(records.data0[index])
+            is_abnormal = bool(_ABNORMAL_LUT[_EVT_IDX[log_type], status_code])
+            if status_code < 0:
+                status_code = None
+            
+            if log_type == 2:  # ATP狀態
                 is_emergency = status_code == 2  # 緊急煞車
                 
                 return {
                     'type': 'ATP狀態變更',
-                    'time': event['timestamp'],
+                    'time': records.datetime_at(index),
                     'status': self._get_atp_status(status_code),
                     'is_emergency': is_emergency,
-                    'is_abnormal': status_code in [2, 3, 4]  # 緊急煞車、故障、異常
+                    'is_abnormal': is_abnormal
                 }
                 
-            elif event['log_type'] == 3:  # MMI狀態
-                data = event['data']
-                status_code = data[0] if len(data) > 0 else None
-                
+            elif log_type == 3:  # MMI狀態
                 return {
                     'type': 'MMI狀態變更',
-                    'time': event['timestamp'],
+                    'time': records.datetime_at(index),
                     'status': self._get_mmi_status(status_code),
-                    'is_abnormal': status_code in [1, 2, 3]  # 顯示異常、按鍵故障、記憶體不足
+                    'is_abnormal': is_abnormal
                 }
                 
-            elif event['log_type'] == 91:  # PRS事件
-                data = event['data']
-                event_code = data[0] if len(data) > 0 else None
-                
+            elif log_type == 91:  # PRS事件
                 return {
                     'type': 'PRS事件',
-                    'time': event['timestamp'],
-                    'event': self._get_prs_event(event_code),
-                    'is_abnormal': event_code in [3, 4, 5]  # CRC錯誤、編號不符、通訊逾時
+                    'time': records.datetime_at(index),
+                    'event': self._get_prs_event(status_code),
+                    'is_abnormal': is_abnormal
                 }
                 
-            elif event['log_type'] == 201:  # ATP關機
+            elif log_type == 201:  # ATP關機
                 return {
                     'type': 'ATP關機',
-                    'time': event['timestamp'],
+                    'time': records.datetime_at(index),
                     'is_atp_down': True
                 }
                 
@@ -199,115 +512,164 @@ class EventProcessor(BaseProcessor):
             
     def _get_atp_status(self, code: int) -> str:
         """取得ATP狀態描述"""
-        status_map = {
-            0: "正常",
-            1: "常用緊軔",
-            2: "緊急緊軔",
-            3: "系統故障",
-            4: "通訊異常",
-            5: "感應子異常"
-        }
-        return status_map.get(code, f"未知狀態({code})")
+        return _describe(_ATP_STATUS, code, "未知狀態")
         
     def _get_mmi_status(self, code: int) -> str:
         """取得MMI狀態描述"""
-        status_map = {
-            0: "正常",
-            1: "顯示異常",
-            2: "按鍵故障",
-            3: "記憶體不足",
-            4: "通訊中斷",
-            5: "系統重啟"
-        }
-        return status_map.get(code, f"未知狀態({code})")
+        return _describe(_MMI_STATUS, code, "未知狀態")
         
     def _get_prs_event(self, code: int) -> str:
         """取得PRS事件描述"""
-        event_map = {
-            0: "通訊正常",
-            1: "列車編號設定",
-            2: "CRC錯誤",
-            3: "通訊逾時",
-            4: "編號不符",
-            5: "連線中斷",
-            6: "連線恢復"
-        }
-        return event_map.get(code, f"未知事件({code})")
+        return _describe(_PRS_EVENTS, code, "未知事件")
+
+def iter_event_details(events: EventColumns) -> Iterator[Dict[str, Any]]:
+    """逐筆解析事件欄式資料為明細, 供匯出完整事件清單
+    
+    Args:
+        events: EventProcessor 結果中的 important_events / abnormal_events
+        
+    Yields:
+        Dict: 事件明細(格式與結果中的重要事件/異常事件相同)
+    """
+    parser = EventProcessor()
+    for index in range(len(events)):
+        event_info = parser._parse_event(events, index)
+        if event_info:
+            yield event_info
 
 class LocationProcessor(BaseProcessor):
     """位置資料處理器"""
     
-    def analyze(self, df: pd.DataFrame,
+    # 位置分布區間寬度(km)
+    BIN_WIDTH = 10
+    # 同一寬度的原始整數單位(cm)
+    BIN_WIDTH_RAW = int(round(BIN_WIDTH * LOCATION_DIVISOR))
+    
+    def analyze(self, records: RecordArrays,
                callback: Optional[callable] = None) -> Dict[str, Any]:
         """分析位置資訊
         
         Args:
-            df: 記錄DataFrame
+            records: 記錄欄式資料
             callback: 進度回調函數
             
         Returns:
             Dict: 位置分析結果
         """
+        self.begin()
+        self.update(records)
+        return self.finish()
+        
+    def begin(self):
+        """開始新的分批分析"""
+        self._min_location = None
+        self._max_location = None
+        self._start_time = None
+        self._end_time = None
+        self._bin_counts = np.zeros(0, dtype=np.int64)
+        
+        # 站間運行時間, 跨批次保留目前站點
+        self._station_times = {}
+        self._current_station = None
+        self._station_entry_time = None  # ns
+        
+    def update(self, records: RecordArrays):
+        """累計一批記錄的位置統計
+        
+        Args:
+            records: 記錄欄式資料
+        """
         try:
             # 篩選位置記錄
-            loc_df = df[df['log_type'] == 211].copy()
+            mask211 = records.log_type == 211
             
-            if loc_df.empty:
-                raise ProcessingError("找不到位置記錄")
+            if mask211.any():
+                locations = records.location[mask211]
+                timestamps = records.timestamp[mask211]
                 
-            # 計算總距離
-            total_distance = loc_df['location'].max() - loc_df['location'].min()
-            
-            # 計算總時間
-            total_time = loc_df['timestamp'].max() - loc_df['timestamp'].min()
-            
-            # 位置分布
-            bins = np.arange(0, loc_df['location'].max() + 10, 10)
-            hist, _ = np.histogram(loc_df['location'], bins=bins)
-            location_dist = {
-                f"{bins[i]:.0f}-{bins[i+1]:.0f}km": int(count)
-                for i, count in enumerate(hist)
-            }
-            
+                # 總距離與總時間
+                batch_min, batch_max = int(locations.min()), int(locations.max())
+                if self._min_location is None or batch_min < self._min_location:
+                    self._min_location = batch_min
+                if self._max_location is None or batch_max > self._max_location:
+                    self._max_location = batch_max
+                start, end = timestamps.min(), timestamps.max()
+                if self._start_time is None or start < self._start_time:
+                    self._start_time = start
+                if self._end_time is None or end > self._end_time:
+                    self._end_time = end
+                    
+                # 位置分布, 依固定寬度累計(區間數隨最大位置成長)
+                idx = locations[locations >= 0] // self.BIN_WIDTH_RAW
+                counts = np.bincount(idx)
+                if counts.size > self._bin_counts.size:
+                    counts[:self._bin_counts.size] += self._bin_counts
+                    self._bin_counts = counts
+                else:
+                    self._bin_counts[:counts.size] += counts
+                    
             # 計算站間運行時間
-            station_times = self._calculate_station_times(df)
-            
-            return {
-                'total_distance': total_distance,
-                'total_time': total_time,
-                '位置分布': location_dist,
-                '站間運行時間': station_times
-            }
+            self._calculate_station_times(records)
             
         except Exception as e:
             self.logger.error(f"位置分析失敗: {e}", exc_info=True)
             raise ProcessingError(f"位置分析失敗: {e}")
             
-    def _calculate_station_times(self, df: pd.DataFrame) -> Dict[str, str]:
-        """計算站間運行時間"""
-        station_times = {}
-        current_station = None
-        station_entry_time = None
-        
-        # 篩選PRS事件(到站)
-        station_events = df[df['log_type'] == 91].sort_values('timestamp')
-        
-        for _, event in station_events.iterrows():
-            try:
-                station_name = event['data'].decode('ascii').strip()
-                if not station_name:
-                    continue
-                    
-                if current_station and station_entry_time:
-                    duration = event['timestamp'] - station_entry_time
-                    key = f"{current_station}->{station_name}"
-                    station_times[key] = f"{duration.total_seconds()/60:.1f}分鐘"
-                    
-                current_station = station_name
-                station_entry_time = event['timestamp']
-                
-            except Exception as e:
-                self.logger.warning(f"站點資料解析失敗: {e}")
+    def finish(self) -> Dict[str, Any]:
+        """結束分批分析
+        
+        Returns:
+            Dict: 位置分析結果
+        """
+        if self._start_time is None:
+            self.logger.error("位置分析失敗: 找不到位置記錄")
+            raise ProcessingError("位置分析失敗: 找不到位置記錄")
+            
+        # 計算總距離
+        total_distance = (self._max_location / LOCATION_DIVISOR
+                          - self._min_location / LOCATION_DIVISOR)
+        
+        # 計算總時間
+        total_time = (self._end_time - self._start_time).astype('timedelta64[us]').item()
+        
+        # 位置分布(與np.histogram相同: 最後一個區間包含右端點)
+        bins = np.arange(0, self._max_location / LOCATION_DIVISOR + self.BIN_WIDTH,
+                         self.BIN_WIDTH)
+        nbins = max(len(bins) - 1, 0)
+        hist = np.zeros(nbins, dtype=np.int64)
+        size = min(nbins, self._bin_counts.size)
+        hist[:size] = self._bin_counts[:size]
+        if nbins:
+            hist[-1] += self._bin_counts[nbins:].sum()
+        location_dist = dict(zip(format_bin_labels(bins, '%.0f', 'km'),
+                                 hist.tolist()))
+        
+        return {
+            'total_distance': total_distance,
+            'total_time': total_time,
+            '位置分布': location_dist,
+            '站間運行時間': dict(self._station_times)
+        }
+            
+    def _calculate_station_times(self, records: RecordArrays):
+        """累計站間運行時間"""
+        # 篩選PRS事件(到站), 只走訪站點記錄而非全部記錄
+        station_idx = np.flatnonzero(records.log_type == 91)
+        timestamps = records.timestamp[station_idx].view(np.int64)
+        order = np.argsort(timestamps, kind='stable')
+        
+        # 依時間排序後轉為Python串列, 迴圈內不再逐筆建立NumPy純量
+        entry_times = timestamps[order].tolist()
+        station_names = records.station_code[station_idx][order].tolist()
+        
+        for entry_ns, station_name in zip(entry_times, station_names):
+            if not station_name:
                 continue
                 
-        return station_times
+            if self._current_station and self._station_entry_time is not None:
+                duration = (entry_ns - self._station_entry_time) / 1e9
+                key = f"{self._current_station}->{station_name}"
+                self._station_times[key] = f"{duration/60:.1f}分鐘"
+                
+            self._current_station = station_name
+            self._station_entry_time = entry_ns
@@ -3,7 +3,12 @@
 import logging
 from pathlib import Path
 from typing import Dict, Any, Optional
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from jinja2 import (
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    select_autoescape
+)
 from .exceptions import ExportError
 
 logger = logging.getLogger(__name__)
@@ -27,7 +32,8 @@ class TemplateManager:
                 loader=FileSystemLoader(str(self.template_dir)),
                 autoescape=select_autoescape(['html', 'xml']),
                 trim_blocks=True,
-                lstrip_blocks=True
+                lstrip_blocks=True,
+                bytecode_cache=self._create_bytecode_cache()
             )
             
             # 添加自定義過濾器
@@ -36,12 +42,30 @@ class TemplateManager:
                 'format_time': self._format_time
             })
             
-            logger.info(f"範本環境已初始化: {self.template_dir}")
+            # 主要範本與靜態內容於首次渲染時載入, 之後重複使用
+            self._report_template = None
+            self._static_context = None
+            
+            logger.info("範本環境已初始化: %s", self.template_dir)
             
         except Exception as e:
             logger.error(f"範本環境初始化失敗: {e}", exc_info=True)
             raise ExportError(f"範本環境初始化失敗: {e}")
             
+    def _create_bytecode_cache(self) -> Optional[FileSystemBytecodeCache]:
+        """建立範本位元組碼快取
+        
+        編譯後的範本存於使用者暫存目錄, 之後的程序可直接載入而不需重新解析。
+        
+        Returns:
+            FileSystemBytecodeCache: 位元組碼快取, 無法建立快取目錄時為None
+        """
+        try:
+            return FileSystemBytecodeCache()
+        except Exception as e:
+            logger.warning(f"無法建立範本快取, 改為每次編譯: {e}")
+            return None
+            
     def render_report(self, data: Dict[str, Any], output_path: Path) -> None:
         """渲染完整報表
         
@@ -50,30 +74,27 @@ class TemplateManager:
             output_path: 輸出檔案路徑
         """
         try:
-            # 載入主要範本
-            template = self.env.get_template('report_template.html')
-            
-            # 載入其他範本內容
-            chart_scripts = self._load_template('chart_scripts.html')
-            interactive_scripts = self._load_template('interactive_scripts.html')
-            styles = self._load_template('print_styles.html')
-            
+            # 載入主要範本與其他範本內容(已載入時直接使用快取)
+            if self._report_template is None:
+                self._report_template = self.env.get_template('report_template.html')
+            if self._static_context is None:
+                self._static_context = {
+                    'chart_scripts': self._load_template('chart_scripts.html'),
+                    'interactive_scripts': self._load_template('interactive_scripts.html'),
+                    'styles': self._load_template('print_styles.html')
+                }
+                
             # 合併所有範本內容
-            context = {
-                **data,
-                'chart_scripts': chart_scripts,
-                'interactive_scripts': interactive_scripts,
-                'styles': styles
-            }
+            context = {**data, **self._static_context}
             
             # 渲染範本
-            content = template.render(**context)
+            content = self._report_template.render(**context)
             
-            # 寫入檔案
+            # 先整份編碼再以單次write寫入, 避免文字緩衝區分段寫出
             output_path.parent.mkdir(parents=True, exist_ok=True)
-            output_path.write_text(content, encoding='utf-8')
+            output_path.write_bytes(content.encode('utf-8'))
             
-            logger.info(f"HTML報表已生成: {output_path}")
+            logger.info("HTML報表已生成: %s", output_path)
             
         except Exception as e:
             logger.error(f"HTML報表生成失敗: {e}", exc_info=True)
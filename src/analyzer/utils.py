@@ -0,0 +1,110 @@
+# src/analyzer/utils.py
+
+import importlib
+import types
+from datetime import datetime, timedelta
+from typing import Any, List
+
+class _LazyModule(types.ModuleType):
+    """延遲載入模組代理
+    
+    建立時不匯入模組, 首次存取屬性時才以importlib載入,
+    之後的屬性存取直接轉發給實際模組。
+    """
+    
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+    
+    def _load(self) -> types.ModuleType:
+        """載入實際模組"""
+        module = self.__dict__['_module']
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__['_module'] = module
+        return module
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._load(), name)
+    
+    def __dir__(self):
+        return dir(self._load())
+    
+    def __repr__(self) -> str:
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+def lazy_import(name: str) -> types.ModuleType:
+    """取得延遲載入的模組
+    
+    Args:
+        name: 模組名稱(如 'pandas')
+    
+    Returns:
+        ModuleType: 模組代理, 首次存取屬性時才實際匯入
+    """
+    return _LazyModule(name)
+
+def format_time(value: datetime, fmt: str = '%Y-%m-%d %H:%M:%S') -> str:
+    """格式化時間
+    
+    Args:
+        value: 時間
+        fmt: 時間格式
+        
+    Returns:
+        str: 格式化後的時間字串
+    """
+    return value.strftime(fmt)
+
+def format_timedelta(value: timedelta) -> str:
+    """格式化時間長度(與pandas.Timedelta字串相同, 如 '0 days 00:06:38')
+    
+    Args:
+        value: 時間長度
+        
+    Returns:
+        str: 格式化後的時間長度字串
+    """
+    hours, rest = divmod(value.seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    sign = '+' if value.days < 0 else ''
+    text = f"{value.days} days {sign}{hours:02d}:{minutes:02d}:{seconds:02d}"
+    if value.microseconds:
+        text += f".{value.microseconds:06d}"
+    return text
+
+def format_number(value: float, digits: int = 2) -> str:
+    """格式化數值
+    
+    Args:
+        value: 數值
+        digits: 小數位數
+        
+    Returns:
+        str: 格式化後的數值字串
+    """
+    return f"{value:.{digits}f}"
+
+def format_bin_labels(edges, fmt: str = '%.1f', suffix: str = '') -> List[str]:
+    """產生直方圖區間標籤("<左界>-<右界><單位>")
+    
+    所有標籤以NumPy字串運算一次格式化, 不逐一執行f-string。
+    
+    Args:
+        edges: 區間邊界(長度為區間數+1)
+        fmt: 邊界數值格式(%格式)
+        suffix: 標籤結尾單位
+        
+    Returns:
+        List[str]: 各區間標籤
+    """
+    import numpy as np
+    
+    edges = np.asarray(edges)
+    left = np.char.mod(fmt, edges[:-1])
+    right = np.char.mod(fmt, edges[1:])
+    labels = np.char.add(np.char.add(left, '-'), right)
+    if suffix:
+        labels = np.char.add(labels, suffix)
+    return labels.tolist()
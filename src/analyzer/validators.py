@@ -1,25 +1,75 @@
 # src/analyzer/validators.py
 
+import hashlib
 import logging
-from typing import List, Dict, Any
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
 import numpy as np
 
 from .exceptions import DataValidationError
-from .models import RURecord
+from .models import RURecord, record_timestamp_ns
+
+try:
+    from ._kernels import _scan_records
+    _HAS_NUMBA = True
+except ImportError:  # numba為選用套件(pip install atp-analyzer[fast])
+    _HAS_NUMBA = False
 
 logger = logging.getLogger(__name__)
 
+def _to_columns(records: List[RURecord]) -> Dict[str, np.ndarray]:
+    """將記錄轉換為驗證用的欄式陣列(各欄位只走訪記錄一次)
+    
+    Args:
+        records: ATP記錄列表
+        
+    Returns:
+        Dict[str, np.ndarray]: log_type / timestamp_ns / speed / location 陣列
+    """
+    def column(attr: str, dtype) -> np.ndarray:
+        return np.fromiter((getattr(r, attr) for r in records),
+                           dtype=dtype, count=len(records))
+    
+    return {
+        'log_type': column('log_type', np.int32),
+        'timestamp_ns': np.fromiter((record_timestamp_ns(r) for r in records),
+                                    dtype=np.int64, count=len(records)),
+        'speed': column('speed', np.float64),
+        'location': column('location', np.float64)
+    }
+
 class DataValidator:
     """ATP記錄資料驗證器"""
     
+    # 有效的事件類型
+    EVENT_TYPES = frozenset({2, 3, 91, 201})
+    EVENT_TYPES_ARR = np.array(sorted(EVENT_TYPES), dtype=np.int32)
+    
+    # 各事件類型的最小資料長度與名稱
+    REQUIRED_LEN = {2: 1, 3: 1, 91: 1, 201: 8}
+    EVENT_NAMES = {2: 'ATP狀態', 3: 'MMI狀態', 91: 'PRS', 201: 'ATP關機'}
+    REQUIRED_LEN_LUT = np.zeros(max(REQUIRED_LEN) + 1, dtype=np.int32)
+    REQUIRED_LEN_LUT[list(REQUIRED_LEN)] = list(REQUIRED_LEN.values())
+    
     def __init__(self):
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
         
         # 設定驗證參數
         self.max_speed = 200.0  # 最大合理速度(km/h)
         self.max_time_gap = 300  # 最大時間間隔(秒)
+        self.max_duration = 86400.0  # 最大記錄時間範圍(秒, 1天)
         self.min_records = 10    # 最小記錄數
+        self.cache_size = 32     # 已驗證資料指紋保留數
+        
+        # 已通過驗證的資料指紋(LRU), 同一份記錄重複分析時略過驗證
+        self._validated: "OrderedDict[bytes, None]" = OrderedDict()
+        # 最近通過驗證的記錄列表與其簡易鍵, 同一列表再次驗證時不必重建欄式陣列
+        self._last_records: Optional[List[RURecord]] = None
+        self._last_quick_key: Optional[Tuple] = None
+        
+        # 速度/位置差分共用的緩衝區, 跨呼叫重複使用
+        self._diff_buf = np.empty(0, dtype=np.float64)
         
     def validate_records(self, records: List[RURecord]):
         """驗證記錄資料的有效性
@@ -31,23 +81,40 @@ class DataValidator:
             DataValidationError: 資料驗證失敗時拋出
         """
         try:
-            self.logger.info(f"開始驗證 {len(records)} 筆記錄")
+            self.logger.info("開始驗證 %d 筆記錄", len(records))
             
             # 1. 基本檢查
             self._validate_basic(records)
             
-            # 2. 時間序列檢查
-            self._validate_timestamps(records)
-            
-            # 3. 速度資料檢查
-            self._validate_speeds(records)
+            # 同一記錄列表(長度與首末時間相同)以相同門檻再次驗證時直接略過
+            quick_key = self._quick_key(records)
+            if records is self._last_records and quick_key == self._last_quick_key:
+                self.logger.info("%d 筆記錄已驗證過, 略過驗證", len(records))
+                return
+                
+            # 數值欄位轉為陣列一次, 供以下各項檢查共用
+            columns = _to_columns(records)
+            event_indices, data_len = self._event_data_lengths(records, columns)
             
-            # 4. 位置資料檢查
-            self._validate_locations(records)
+            # 內容與門檻完全相同的記錄已通過驗證時略過其餘檢查
+            key = self._fingerprint(columns, data_len, self._thresholds())
+            if key in self._validated:
+                self._validated.move_to_end(key)
+                self._remember_list(records, quick_key)
+                self.logger.info("%d 筆記錄已驗證過, 略過驗證", len(records))
+                return
+                
+            # 2~4. 時間序列、速度與位置檢查
+            if not (_HAS_NUMBA and self._validate_scanned(columns)):
+                self._validate_timestamps(columns)
+                self._validate_speeds(columns)
+                self._validate_locations(columns)
             
             # 5. 事件資料檢查
-            self._validate_events(records)
+            self._validate_events(records, columns, event_indices, data_len)
             
+            self._remember(key)
+            self._remember_list(records, quick_key)
             self.logger.info("資料驗證通過")
             
         except DataValidationError:
@@ -56,6 +123,72 @@ class DataValidator:
             self.logger.error(f"資料驗證過程發生錯誤: {e}", exc_info=True)
             raise DataValidationError(f"資料驗證失敗: {e}")
             
+    def _thresholds(self) -> Tuple[float, ...]:
+        """取得目前的驗證門檻(可於驗證後修改, 須納入快取鍵)"""
+        return (float(self.max_speed), float(self.max_time_gap),
+                float(self.max_duration), float(self.min_records))
+        
+    def _quick_key(self, records: List[RURecord]) -> Tuple:
+        """計算不需走訪全部記錄的簡易鍵
+        
+        Args:
+            records: ATP記錄列表
+            
+        Returns:
+            Tuple: (記錄數, 首筆時間, 末筆時間, 驗證門檻)
+        """
+        return (len(records), record_timestamp_ns(records[0]),
+                record_timestamp_ns(records[-1]), self._thresholds())
+        
+    @staticmethod
+    def _fingerprint(columns: Dict[str, np.ndarray], data_len: np.ndarray,
+                     thresholds: Tuple[float, ...]) -> bytes:
+        """計算驗證內容的指紋
+        
+        涵蓋各項檢查用到的所有欄位(含事件資料長度)與驗證門檻,
+        內容與門檻相同才會得到相同指紋。
+        
+        Args:
+            columns: 驗證用欄式陣列
+            data_len: 事件記錄資料長度
+            thresholds: 驗證門檻
+            
+        Returns:
+            bytes: 資料指紋(BLAKE2b摘要)
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for name in ('log_type', 'timestamp_ns', 'speed', 'location'):
+            digest.update(columns[name].tobytes())
+        digest.update(data_len.tobytes())
+        digest.update(np.array(thresholds, dtype=np.float64).tobytes())
+        return digest.digest()
+        
+    def _remember_list(self, records: List[RURecord], quick_key: Tuple):
+        """記錄最近通過驗證的記錄列表(保留參照, 以身分比對而非id)"""
+        self._last_records = records
+        self._last_quick_key = quick_key
+        
+    def _remember(self, key: bytes):
+        """記錄已通過驗證的資料指紋, 超過保留數時移除最久未使用者"""
+        self._validated[key] = None
+        self._validated.move_to_end(key)
+        while len(self._validated) > self.cache_size:
+            self._validated.popitem(last=False)
+            
+    def _diff(self, values: np.ndarray) -> np.ndarray:
+        """計算相鄰差值, 結果寫入共用緩衝區
+        
+        Args:
+            values: 數值陣列(float64)
+            
+        Returns:
+            np.ndarray: 差值(緩衝區視圖, 下次呼叫時會被覆寫)
+        """
+        n = max(values.size - 1, 0)
+        if self._diff_buf.size < n:
+            self._diff_buf = np.empty(n, dtype=np.float64)
+        return np.subtract(values[1:], values[:-1], out=self._diff_buf[:n])
+        
     def _validate_basic(self, records: List[RURecord]):
         """基本資料檢查"""
         # 檢查記錄數量
@@ -67,63 +200,108 @@ class DataValidator:
                 f"記錄數量不足: {len(records)} < {self.min_records}"
             )
             
-        # 檢查必要欄位
-        for i, record in enumerate(records):
-            if not hasattr(record, 'log_type'):
-                raise DataValidationError(f"記錄 {i} 缺少log_type欄位")
-            if not hasattr(record, 'timestamp'):
-                raise DataValidationError(f"記錄 {i} 缺少timestamp欄位")
-            if not hasattr(record, 'data'):
-                raise DataValidationError(f"記錄 {i} 缺少data欄位")
+        # 檢查必要欄位(記錄結構固定, 只需檢查第一筆)
+        for field in ('log_type', 'timestamp', 'data'):
+            if not hasattr(records[0], field):
+                raise DataValidationError(f"記錄 0 缺少{field}欄位")
                 
-    def _validate_timestamps(self, records: List[RURecord]):
+    def _validate_scanned(self, columns: Dict[str, np.ndarray]) -> bool:
+        """以numba核心單次走訪完成時間、速度與位置檢查
+        
+        Args:
+            columns: 驗證用欄式陣列
+            
+        Returns:
+            bool: 是否已完成檢查(資料不足以計算差值時為False, 改用NumPy實作)
+        """
+        if columns['log_type'].size < 2:
+            return False
+            
+        (min_gap_ns, max_gap_ns, n_pos, max_speed, max_acc, max_dec,
+         min_loc_diff, max_loc_diff) = _scan_records(
+            columns['log_type'], columns['timestamp_ns'],
+            columns['speed'], columns['location']
+        )
+        if n_pos < 2:
+            return False
+            
+        timestamps_ns = columns['timestamp_ns']
+        self._check_timestamps(min_gap_ns, max_gap_ns,
+                               timestamps_ns[-1] - timestamps_ns[0])
+        self._check_speed_range(max_speed)
+        self._check_speed_changes(max_acc, max_dec)
+        self._check_locations(min_loc_diff, max_loc_diff)
+        return True
+        
+    def _validate_timestamps(self, columns: Dict[str, np.ndarray]):
         """時間序列檢查"""
-        timestamps = [r.timestamp for r in records]
+        timestamps_ns = columns['timestamp_ns']
+        
+        # 時間差(整數奈秒)只計算一次, 供順序與間隔檢查共用
+        time_gaps_ns = np.diff(timestamps_ns)
+        
+        self._check_timestamps(time_gaps_ns.min(), time_gaps_ns.max(),
+                               timestamps_ns[-1] - timestamps_ns[0])
+        
+    def _check_timestamps(self, min_gap_ns: int, max_gap_ns: int,
+                          duration_ns: int):
+        """依時間間隔統計值檢查時間序列
         
-        # 檢查時間順序
-        if not all(t1 <= t2 for t1, t2 in zip(timestamps[:-1], timestamps[1:])):
+        Args:
+            min_gap_ns: 最小時間間隔(奈秒)
+            max_gap_ns: 最大時間間隔(奈秒)
+            duration_ns: 首尾時間差(奈秒)
+        """
+        # 檢查時間順序(以最小間隔判斷, 不另建布林陣列)
+        if min_gap_ns < 0:
             raise DataValidationError("時間序列不是遞增的")
             
-        # 檢查時間間隔
-        time_gaps = np.diff([t.timestamp() for t in timestamps])
-        max_gap = np.max(time_gaps)
+        # 檢查時間間隔(只將最大值換算為秒)
+        max_gap = max_gap_ns * 1e-9
         
         if max_gap > self.max_time_gap:
             raise DataValidationError(
                 f"時間間隔過大: {max_gap:.1f}秒 > {self.max_time_gap}秒"
             )
             
-        # 檢查時間範圍合理性
-        start_time = min(timestamps)
-        end_time = max(timestamps)
-        duration = end_time - start_time
+        # 檢查時間範圍合理性(遞增序列的範圍即首尾差)
+        duration = duration_ns * 1e-9
         
-        if duration > timedelta(days=1):
+        if duration > self.max_duration:
             raise DataValidationError(
-                f"記錄時間範圍過大: {duration.total_seconds()/3600:.1f}小時"
+                f"記錄時間範圍過大: {duration/3600:.1f}小時"
             )
             
-    def _validate_speeds(self, records: List[RURecord]):
+    def _validate_speeds(self, columns: Dict[str, np.ndarray]):
         """速度資料檢查"""
-        speed_records = [r for r in records if r.log_type == 211]
+        speeds = columns['speed'][columns['log_type'] == 211]
         
-        if not speed_records:
+        if not speeds.size:
             raise DataValidationError("找不到速度記錄")
             
-        speeds = [r.speed/100.0 for r in speed_records]  # 轉換為km/h
+        speeds = speeds / 100.0  # 轉換為km/h
         
         # 檢查速度範圍
-        max_speed = max(speeds)
+        self._check_speed_range(speeds.max())
+        
+        # 檢查速度變化
+        speed_diffs = self._diff(speeds)
+        self._check_speed_changes(speed_diffs.max(), speed_diffs.min())
+        
+    def _check_speed_range(self, max_speed: float):
+        """檢查最高速度是否在合理範圍"""
         if max_speed > self.max_speed:
             raise DataValidationError(
                 f"速度值超出合理範圍: {max_speed:.1f} > {self.max_speed} km/h"
             )
             
-        # 檢查速度變化
-        speed_diffs = np.diff(speeds)
-        max_acc = max(speed_diffs)  # 最大加速度(km/h/s)
-        max_dec = min(speed_diffs)  # 最大減速度(km/h/s)
+    def _check_speed_changes(self, max_acc: float, max_dec: float):
+        """檢查速度變化
         
+        Args:
+            max_acc: 最大加速度(km/h/s)
+            max_dec: 最大減速度(km/h/s)
+        """
         if max_acc > 5.0:  # 加速度過大
             raise DataValidationError(
                 f"加速度異常: {max_acc:.1f} km/h/s"
@@ -134,66 +312,80 @@ class DataValidator:
                 f"減速度異常: {max_dec:.1f} km/h/s"
             )
             
-    def _validate_locations(self, records: List[RURecord]):
+    def _validate_locations(self, columns: Dict[str, np.ndarray]):
         """位置資料檢查"""
-        location_records = [r for r in records if r.log_type == 211]
+        locations = columns['location'][columns['log_type'] == 211]
         
-        if not location_records:
+        if not locations.size:
             raise DataValidationError("找不到位置記錄")
             
-        locations = [r.location/100000.0 for r in location_records]  # 轉換為km
+        locations = locations / 100000.0  # 轉換為km
+        location_diffs = self._diff(locations)
+        self._check_locations(location_diffs.min(), location_diffs.max())
         
-        # 檢查位置遞增
-        if not all(l1 <= l2 for l1, l2 in zip(locations[:-1], locations[1:])):
+    def _check_locations(self, min_diff: float, max_diff: float):
+        """依位置增量統計值檢查位置序列
+        
+        Args:
+            min_diff: 最小位置增量(km)
+            max_diff: 最大位置增量(km)
+        """
+        # 檢查位置遞增(以最小差值判斷, 不建立布林暫存陣列)
+        if min_diff < 0:
             raise DataValidationError("位置序列不是單調遞增的")
             
         # 檢查位置變化合理性
-        location_diffs = np.diff(locations)
-        max_diff = max(location_diffs)
-        
         if max_diff > 1.0:  # 1km/s = 3600km/h
             raise DataValidationError(
                 f"位置變化異常: {max_diff*3600:.1f} km/h"
             )
             
-    def _validate_events(self, records: List[RURecord]):
-        """事件資料檢查"""
-        event_types = {2, 3, 91, 201}  # 有效的事件類型
+    def _event_data_lengths(self, records: List[RURecord],
+                            columns: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """選出事件記錄並取得其資料長度
         
-        event_records = [r for r in records if r.log_type in event_types]
+        Args:
+            records: ATP記錄列表
+            columns: 驗證用欄式陣列
+            
+        Returns:
+            Tuple: (事件記錄索引, 資料長度(無資料為0))
+        """
+        # 以log_type陣列一次選出事件記錄
+        event_indices = np.flatnonzero(
+            np.isin(columns['log_type'], self.EVENT_TYPES_ARR)
+        )
+        data_len = np.fromiter(
+            (len(records[i].data) if records[i].data else 0
+             for i in event_indices.tolist()),
+            dtype=np.int64, count=event_indices.size
+        )
+        return event_indices, data_len
         
-        # 檢查事件類型
-        invalid_types = set(r.log_type for r in event_records) - event_types
-        if invalid_types:
+    def _validate_events(self, records: List[RURecord],
+                         columns: Dict[str, np.ndarray],
+                         event_indices: np.ndarray, data_len: np.ndarray):
+        """事件資料檢查"""
+        if not event_indices.size:
+            return
+            
+        # 事件資料長度與各類型要求長度比較
+        required = self.REQUIRED_LEN_LUT[columns['log_type'][event_indices]]
+        bad = (data_len == 0) | (data_len < required)
+        if not bad.any():
+            return
+            
+        # 回報第一筆不合格的事件記錄
+        record = records[event_indices[bad.argmax()]]
+        if not record.data:
             raise DataValidationError(
-                f"發現無效的事件類型: {invalid_types}"
+                f"事件記錄缺少資料: type={record.log_type}, "
+                f"time={record.timestamp}"
             )
-            
-        # 檢查事件資料
-        for record in event_records:
-            if not record.data:
-                raise DataValidationError(
-                    f"事件記錄缺少資料: type={record.log_type}, "
-                    f"time={record.timestamp}"
-                )
-                
-            # 特定事件類型的資料長度檢查
-            if record.log_type == 2 and len(record.data) < 1:
-                raise DataValidationError(
-                    f"ATP狀態事件資料不完整: time={record.timestamp}"
-                )
-            elif record.log_type == 3 and len(record.data) < 1:
-                raise DataValidationError(
-                    f"MMI狀態事件資料不完整: time={record.timestamp}"
-                )
-            elif record.log_type == 91 and len(record.data) < 1:
-                raise DataValidationError(
-                    f"PRS事件資料不完整: time={record.timestamp}"
-                )
-            elif record.log_type == 201 and len(record.data) < 8:
-                raise DataValidationError(
-                    f"ATP關機事件資料不完整: time={record.timestamp}"
-                )
+        raise DataValidationError(
+            f"{self.EVENT_NAMES[record.log_type]}事件資料不完整: "
+            f"time={record.timestamp}"
+        )
                 
     def validate_configuration(self, config: Dict[str, Any]):
         """驗證分析器配置
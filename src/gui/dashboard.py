@@ -7,12 +7,47 @@ from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QFont
 import pyqtgraph as pg
 import numpy as np
+import html
 from datetime import datetime
 from typing import Dict, List, Optional
 from .widgets import SpeedGauge, EventIndicator, LocationDisplay, TimeDisplay
 from visualization.atp_visualizer import ATPDataVisualizer
 from analyzer.atp_analyzer import ATPAnalyzer
 
+# 固定樣式表, 模組載入時建立一次
+_TRAIN_LABEL_QSS = """
+    QLabel {
+        font-size: 14px;
+        font-weight: bold;
+        color: #2c3e50;
+    }
+"""
+
+_MODE_LABEL_QSS = """
+    QLabel {
+        font-size: 14px;
+        color: %s;
+    }
+"""
+
+_STATUS_LABEL_QSS = """
+    QLabel {
+        padding: 5px;
+        border-radius: 3px;
+        background-color: #2ecc71;
+        color: white;
+    }
+"""
+
+# 運行模式顏色及對應樣式表
+_MODE_COLORS = {
+    "全監控": "#27ae60",
+    "目視行車": "#f39c12",
+    "系統隔離": "#c0392b"
+}
+_MODE_QSS = {mode: _MODE_LABEL_QSS % color for mode, color in _MODE_COLORS.items()}
+_DEFAULT_MODE_QSS = _MODE_LABEL_QSS % "#7f8c8d"
+
 class DashboardWidget(QWidget):
     """ATP分析儀表板元件"""
     
@@ -60,13 +95,7 @@ class DashboardWidget(QWidget):
         
         # 列車號
         self.train_label = QLabel("列車號: ---")
-        self.train_label.setStyleSheet("""
-            QLabel {
-                font-size: 14px;
-                font-weight: bold;
-                color: #2c3e50;
-            }
-        """)
+        self.train_label.setStyleSheet(_TRAIN_LABEL_QSS)
         layout.addWidget(self.train_label)
         
         # 時間顯示
@@ -75,12 +104,7 @@ class DashboardWidget(QWidget):
         
         # 運行模式
         self.mode_label = QLabel("模式: 全監控")
-        self.mode_label.setStyleSheet("""
-            QLabel {
-                font-size: 14px;
-                color: #27ae60;
-            }
-        """)
+        self.mode_label.setStyleSheet(_MODE_QSS["全監控"])
         layout.addWidget(self.mode_label)
         
         return layout
@@ -145,21 +169,19 @@ class DashboardWidget(QWidget):
         stats_group = QGroupBox("統計資訊")
         stats_layout = QGridLayout()
         
-        # 添加統計標籤
-        self.stats_labels = {
-            'max_speed': QLabel("最高速度: ---"),
-            'avg_speed': QLabel("平均速度: ---"),
-            'distance': QLabel("行駛距離: ---"),
-            'run_time': QLabel("運行時間: ---"),
-            'over_speed': QLabel("超速次數: ---"),
-            'emergency': QLabel("緊急煞車: ---")
+        # 統計資訊以單一標籤顯示, 每次更新只需一次setText
+        self.stats_text = {
+            'max_speed': "最高速度: ---",
+            'avg_speed': "平均速度: ---",
+            'distance': "行駛距離: ---",
+            'run_time': "運行時間: ---",
+            'over_speed': "超速次數: ---",
+            'emergency': "緊急煞車: ---"
         }
-        
-        row = 0
-        for label in self.stats_labels.values():
-            label.setStyleSheet("font-size: 12px;")
-            stats_layout.addWidget(label, row, 0)
-            row += 1
+        self.stats_label = QLabel("<br>".join(self.stats_text.values()))
+        self.stats_label.setTextFormat(Qt.TextFormat.RichText)
+        self.stats_label.setStyleSheet("font-size: 12px;")
+        stats_layout.addWidget(self.stats_label, 0, 0)
             
         stats_group.setLayout(stats_layout)
         layout.addWidget(stats_group)
@@ -172,47 +194,42 @@ class DashboardWidget(QWidget):
         
         # ATP狀態
         self.atp_status = QLabel("ATP狀態: 正常")
-        self.atp_status.setStyleSheet("""
-            QLabel {
-                padding: 5px;
-                border-radius: 3px;
-                background-color: #2ecc71;
-                color: white;
-            }
-        """)
+        self.atp_status.setStyleSheet(_STATUS_LABEL_QSS)
         layout.addWidget(self.atp_status)
         
         # 煞車狀態
         self.brake_status = QLabel("煞車狀態: 正常")
-        self.brake_status.setStyleSheet("""
-            QLabel {
-                padding: 5px;
-                border-radius: 3px;
-                background-color: #2ecc71;
-                color: white;
-            }
-        """)
+        self.brake_status.setStyleSheet(_STATUS_LABEL_QSS)
         layout.addWidget(self.brake_status)
         
         # PRS狀態
         self.prs_status = QLabel("PRS狀態: 正常")
-        self.prs_status.setStyleSheet("""
-            QLabel {
-                padding: 5px;
-                border-radius: 3px;
-                background-color: #2ecc71;
-                color: white;
-            }
-        """)
+        self.prs_status.setStyleSheet(_STATUS_LABEL_QSS)
         layout.addWidget(self.prs_status)
         
         return layout
         
     def setup_timer(self):
-        """設置更新計時器"""
-        self.update_timer = QTimer()
+        """設置更新計時器
+        
+        計時器只在儀表板顯示時執行, 隱藏時停止以免閒置喚醒。
+        """
+        self.update_timer = QTimer(self)
+        self.update_timer.setInterval(1000)  # 每秒更新一次
+        # 時鐘只需秒級精度, 允許系統合併喚醒
+        self.update_timer.setTimerType(Qt.TimerType.CoarseTimer)
         self.update_timer.timeout.connect(self.update_dashboard)
-        self.update_timer.start(1000)  # 每秒更新一次
+        
+    def showEvent(self, event):
+        """顯示時立即更新並啟動計時器"""
+        super().showEvent(event)
+        self.update_dashboard()
+        self.update_timer.start()
+        
+    def hideEvent(self, event):
+        """隱藏時停止計時器"""
+        super().hideEvent(event)
+        self.update_timer.stop()
         
     def update_dashboard(self):
         """更新儀表板資料"""
@@ -237,48 +254,46 @@ class DashboardWidget(QWidget):
         # 更新事件散點圖
         self.visualizer.plot_events(self.event_plot, latest_events)
         
+        # 各類型只取最新一筆, 每個狀態指示器最多設定一次
+        last = {}
+        for event in latest_events:
+            last[event['type']] = event
+            
         # 更新系統狀態
-        for event in reversed(latest_events):
-            if event['type'] == 'ATP':
-                self.event_indicator.set_atp_status(event['description'], 
-                                                  event['severity'] == 'CRITICAL')
-            elif event['type'] == 'BRAKE':
-                self.event_indicator.set_brake_status(event['description'],
-                                                    event['severity'] == 'CRITICAL')
-            elif event['type'] == 'PRS':
-                self.event_indicator.set_prs_status(event['description'],
-                                                  event['severity'] == 'CRITICAL')
+        if 'ATP' in last:
+            event = last['ATP']
+            self.event_indicator.set_atp_status(event['description'], 
+                                              event['severity'] == 'CRITICAL')
+        if 'BRAKE' in last:
+            event = last['BRAKE']
+            self.event_indicator.set_brake_status(event['description'],
+                                                event['severity'] == 'CRITICAL')
+        if 'PRS' in last:
+            event = last['PRS']
+            self.event_indicator.set_prs_status(event['description'],
+                                              event['severity'] == 'CRITICAL')
                 
     def update_statistics(self, stats: Dict):
         """更新統計資訊"""
         if not stats:
             return
             
-        # 更新統計標籤
+        # 更新統計文字(未提供的項目保留原值)
         if 'max_speed' in stats:
-            self.stats_labels['max_speed'].setText(
-                f"最高速度: {stats['max_speed']:.1f} km/h"
-            )
+            self.stats_text['max_speed'] = f"最高速度: {stats['max_speed']:.1f} km/h"
         if 'avg_speed' in stats:
-            self.stats_labels['avg_speed'].setText(
-                f"平均速度: {stats['avg_speed']:.1f} km/h"
-            )
+            self.stats_text['avg_speed'] = f"平均速度: {stats['avg_speed']:.1f} km/h"
         if 'distance' in stats:
-            self.stats_labels['distance'].setText(
-                f"行駛距離: {stats['distance']:.2f} km"
-            )
+            self.stats_text['distance'] = f"行駛距離: {stats['distance']:.2f} km"
         if 'run_time' in stats:
-            self.stats_labels['run_time'].setText(
-                f"運行時間: {stats['run_time']}"
-            )
+            self.stats_text['run_time'] = f"運行時間: {html.escape(str(stats['run_time']))}"
         if 'over_speed' in stats:
-            self.stats_labels['over_speed'].setText(
-                f"超速次數: {stats['over_speed']}"
-            )
+            self.stats_text['over_speed'] = f"超速次數: {stats['over_speed']}"
         if 'emergency' in stats:
-            self.stats_labels['emergency'].setText(
-                f"緊急煞車: {stats['emergency']}"
-            )
+            self.stats_text['emergency'] = f"緊急煞車: {stats['emergency']}"
+            
+        # 一次設定整個統計區塊, 只觸發一次重新排版
+        self.stats_label.setText("<br>".join(self.stats_text.values()))
             
     def set_train_info(self, train_no: str):
         """設置列車資訊"""
@@ -289,18 +304,4 @@ class DashboardWidget(QWidget):
         self.mode_label.setText(f"模式: {mode}")
         
         # 根據模式設置顏色
-        if mode == "全監控":
-            color = "#27ae60"
-        elif mode == "目視行車":
-            color = "#f39c12"
-        elif mode == "系統隔離":
-            color = "#c0392b"
-        else:
-            color = "#7f8c8d"
-            
-        self.mode_label.setStyleSheet(f"""
-            QLabel {{
-                font-size: 14px;
-                color: {color};
-            }}
-        """)
+        self.mode_label.setStyleSheet(_MODE_QSS.get(mode, _DEFAULT_MODE_QSS))
@@ -5,12 +5,73 @@ from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QGridLayout,
                            QLabel, QLineEdit, QPushButton, QComboBox,
                            QSpinBox, QDoubleSpinBox, QCheckBox, QGroupBox,
                            QTabWidget, QWidget, QFormLayout, QDialogButtonBox,
-                           QFileDialog, QMessageBox)
-from PyQt6.QtCore import Qt, pyqtSignal
-from PyQt6.QtGui import QFont
+                           QFileDialog, QMessageBox, QTableView, QHeaderView)
+from PyQt6.QtCore import Qt, pyqtSignal, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QFont, QColor
+import pyqtgraph as pg
+import numpy as np
 import json
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional
+
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:  # 未安裝orjson時使用標準json模組
+    _HAS_ORJSON = False
+
+try:
+    import OpenGL  # noqa: F401 (pyqtgraph以此繪製OpenGL圖表)
+    _HAS_OPENGL = True
+except ImportError:  # 未安裝PyOpenGL時使用Qt光柵繪圖
+    _HAS_OPENGL = False
+
+def _dumps_settings(settings: Dict) -> bytes:
+    """將設定序列化為UTF-8 JSON(縮排2格)"""
+    if _HAS_ORJSON:
+        return orjson.dumps(settings, option=orjson.OPT_INDENT_2)
+    return json.dumps(settings, ensure_ascii=False, indent=2).encode('utf-8')
+
+def _loads_settings(data: bytes) -> Dict:
+    """解析UTF-8 JSON設定內容"""
+    if _HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _format_times(times: List) -> List[str]:
+    """將時間一次格式化為 "YYYY-MM-DD HH:MM:SS" 字串
+    
+    無時區的時間以NumPy datetime64整批格式化; 含時區時逐筆strftime,
+    以保留原本的當地時間。
+    
+    Args:
+        times: datetime列表
+        
+    Returns:
+        List[str]: 格式化後的時間字串
+    """
+    if not times:
+        return []
+    if any(t.tzinfo is not None for t in times):
+        return [t.strftime("%Y-%m-%d %H:%M:%S") for t in times]
+    values = np.array(times, dtype='datetime64[s]')
+    return np.char.replace(
+        np.datetime_as_string(values, unit='s'), 'T', ' '
+    ).tolist()
+
+@lru_cache(maxsize=4)
+def _load_settings_cached(path: str, mtime_ns: int) -> Dict:
+    """讀取並解析設定檔(以路徑與修改時間為快取鍵)
+    
+    Args:
+        path: 設定檔路徑
+        mtime_ns: 設定檔修改時間(奈秒), 檔案變更後自動重新讀取
+        
+    Returns:
+        Dict: 設定內容(共用快取物件, 呼叫端不可修改)
+    """
+    return _loads_settings(Path(path).read_bytes())
 
 class BaseDialog(QDialog):
     """對話框基礎類別"""
@@ -65,21 +126,49 @@ class SettingsDialog(BaseDialog):
         self.tab_widget = QTabWidget()
         self.main_layout.insertWidget(0, self.tab_widget)
         
-        # 一般設定頁面
-        self.create_general_tab()
+        # 分頁內容在首次切換到該頁時才建立: (標題, 建立函數, 設定區段, 設定函數)
+        self._tabs = [
+            ("一般設定", self.create_general_tab, 'general', self._set_general_data),
+            ("ATP 設定", self.create_atp_tab, 'atp', self._set_atp_data),
+            ("分析設定", self.create_analysis_tab, 'analysis', self._set_analysis_data),
+            ("視覺化設定", self.create_visualization_tab, 'visualization',
+             self._set_visualization_data)
+        ]
+        self._tab_built = set()
+        self._settings = {}
+        
+        for title, *_ in self._tabs:
+            self.tab_widget.addTab(QWidget(), title)
+            
+        self.tab_widget.currentChanged.connect(self._ensure_tab)
+        self._ensure_tab(self.tab_widget.currentIndex())
         
-        # ATP 設定頁面
-        self.create_atp_tab()
+    def _ensure_tab(self, index: int):
+        """確保分頁內容已建立, 首次建立時套用已載入的設定
         
-        # 分析設定頁面
-        self.create_analysis_tab()
+        Args:
+            index: 分頁索引
+        """
+        if index < 0 or index in self._tab_built:
+            return
+            
+        _, builder, section, setter = self._tabs[index]
+        builder(self.tab_widget.widget(index))
+        self._tab_built.add(index)
         
-        # 視覺化設定頁面
-        self.create_visualization_tab()
+        if self._settings:
+            # 與load_settings相同: 設定值錯誤時提示, 不讓例外離開Qt信號處理
+            try:
+                setter(self._settings.get(section, {}))
+            except Exception as e:
+                QMessageBox.warning(self, "警告", f"載入設定失敗: {str(e)}")
+            
+    def create_general_tab(self, tab: QWidget):
+        """建立一般設定頁面
         
-    def create_general_tab(self):
-        """建立一般設定頁面"""
-        tab = QWidget()
+        Args:
+            tab: 分頁元件
+        """
         layout = QFormLayout()
         
         # 檔案路徑設定
@@ -108,11 +197,13 @@ class SettingsDialog(BaseDialog):
         layout.addRow("更新設定:", self.auto_update)
         
         tab.setLayout(layout)
-        self.tab_widget.addTab(tab, "一般設定")
         
-    def create_atp_tab(self):
-        """建立 ATP 設定頁面"""
-        tab = QWidget()
+    def create_atp_tab(self, tab: QWidget):
+        """建立 ATP 設定頁面
+        
+        Args:
+            tab: 分頁元件
+        """
         layout = QVBoxLayout()
         
         # 速度設定群組
@@ -149,11 +240,13 @@ class SettingsDialog(BaseDialog):
         
         layout.addStretch()
         tab.setLayout(layout)
-        self.tab_widget.addTab(tab, "ATP 設定")
         
-    def create_analysis_tab(self):
-        """建立分析設定頁面"""
-        tab = QWidget()
+    def create_analysis_tab(self, tab: QWidget):
+        """建立分析設定頁面
+        
+        Args:
+            tab: 分頁元件
+        """
         layout = QFormLayout()
         
         # 分析參數設定
@@ -180,11 +273,13 @@ class SettingsDialog(BaseDialog):
         layout.addRow("平行處理:", self.parallel_processing)
         
         tab.setLayout(layout)
-        self.tab_widget.addTab(tab, "分析設定")
         
-    def create_visualization_tab(self):
-        """建立視覺化設定頁面"""
-        tab = QWidget()
+    def create_visualization_tab(self, tab: QWidget):
+        """建立視覺化設定頁面
+        
+        Args:
+            tab: 分頁元件
+        """
         layout = QFormLayout()
         
         # 圖表設定
@@ -211,7 +306,6 @@ class SettingsDialog(BaseDialog):
         layout.addRow("動畫時間 (毫秒):", self.animation_duration)
         
         tab.setLayout(layout)
-        self.tab_widget.addTab(tab, "視覺化設定")
         
     def _browse_path(self, line_edit: QLineEdit):
         """瀏覽路徑"""
@@ -227,7 +321,8 @@ class SettingsDialog(BaseDialog):
         """載入設定"""
         try:
             if self.config_file.exists():
-                settings = json.loads(self.config_file.read_text(encoding='utf-8'))
+                mtime_ns = self.config_file.stat().st_mtime_ns
+                settings = _load_settings_cached(str(self.config_file), mtime_ns)
                 self.set_data(settings)
         except Exception as e:
             QMessageBox.warning(self, "警告", f"載入設定失敗: {str(e)}")
@@ -237,10 +332,9 @@ class SettingsDialog(BaseDialog):
         try:
             settings = self.get_data()
             self.config_file.parent.mkdir(parents=True, exist_ok=True)
-            self.config_file.write_text(
-                json.dumps(settings, ensure_ascii=False, indent=2),
-                encoding='utf-8'
-            )
+            self.config_file.write_bytes(_dumps_settings(settings))
+            # 修改時間精度不足時可能與舊快取相同, 寫入後一律清除
+            _load_settings_cached.cache_clear()
             self.settings_changed.emit(settings)
         except Exception as e:
             QMessageBox.warning(self, "警告", f"儲存設定失敗: {str(e)}")
@@ -252,6 +346,10 @@ class SettingsDialog(BaseDialog):
         
     def get_data(self) -> Dict:
         """獲取設定數據"""
+        # 尚未開啟過的分頁先建立, 以讀取其欄位值
+        for index in range(len(self._tabs)):
+            self._ensure_tab(index)
+            
         return {
             'general': {
                 'log_path': self.log_path.text(),
@@ -286,30 +384,36 @@ class SettingsDialog(BaseDialog):
         if not data:
             return
             
-        # 一般設定
-        general = data.get('general', {})
+        # 保留設定, 尚未建立的分頁於首次開啟時套用
+        self._settings = data
+        for index in self._tab_built:
+            _, _, section, setter = self._tabs[index]
+            setter(data.get(section, {}))
+            
+    def _set_general_data(self, general: Dict):
+        """設置一般設定"""
         self.log_path.setText(general.get('log_path', ''))
         self.theme_combo.setCurrentText(general.get('theme', '明亮'))
         self.lang_combo.setCurrentText(general.get('language', '繁體中文'))
         self.auto_update.setChecked(general.get('auto_update', True))
         
-        # ATP 設定
-        atp = data.get('atp', {})
+    def _set_atp_data(self, atp: Dict):
+        """設置 ATP 設定"""
         self.speed_limit.setValue(atp.get('speed_limit', 90))
         self.warning_speed.setValue(atp.get('warning_speed', 80))
         self.check_interval.setValue(atp.get('check_interval', 5))
         self.auto_reconnect.setChecked(atp.get('auto_reconnect', True))
         
-        # 分析設定
-        analysis = data.get('analysis', {})
+    def _set_analysis_data(self, analysis: Dict):
+        """設置分析設定"""
         self.chunk_size.setValue(analysis.get('chunk_size', 1000))
         self.smooth_window.setValue(analysis.get('smooth_window', 5))
         self.outlier_threshold.setValue(analysis.get('outlier_threshold', 3.0))
         self.enable_cache.setChecked(analysis.get('enable_cache', True))
         self.parallel_processing.setChecked(analysis.get('parallel_processing', True))
         
-        # 視覺化設定
-        visualization = data.get('visualization', {})
+    def _set_visualization_data(self, visualization: Dict):
+        """設置視覺化設定"""
         self.show_grid.setChecked(visualization.get('show_grid', True))
         self.line_width.setValue(visualization.get('line_width', 2))
         self.marker_size.setValue(visualization.get('marker_size', 8))
@@ -426,8 +530,10 @@ class SpeedAnalysisDialog(BaseDialog):
         
     def setup_plot(self):
         """設置圖表"""
-        # 速度曲線圖
+        # 速度曲線圖(長時間記錄點數多, 可用時以OpenGL繪製)
         self.speed_plot = pg.PlotWidget()
+        if _HAS_OPENGL:
+            self.speed_plot.useOpenGL(True)
         self.speed_plot.setBackground('w')
         self.speed_plot.showGrid(x=True, y=True)
         self.speed_plot.setLabel('left', '速度', units='km/h')
@@ -448,6 +554,13 @@ class SpeedAnalysisDialog(BaseDialog):
             pen=pg.mkPen('r', width=2, style=Qt.PenStyle.DashLine)
         )
         
+        # 速度分布曲線(保留同一物件, 更新時只替換資料)
+        self.dist_curve = self.dist_plot.plot(
+            stepMode=True,
+            fillLevel=0,
+            brush=(0,0,255,50)
+        )
+        
     def start_analysis(self):
         """開始分析"""
         # 獲取分析參數
@@ -477,30 +590,43 @@ class SpeedAnalysisDialog(BaseDialog):
         if 'over_speed_ratio' in stats:
             self.stats_labels['over_speed_ratio'].setText(f"{stats['over_speed_ratio']:.1f}%")
             
-        # 更新速度曲線
-        if 'speed_data' in results:
-            data = results['speed_data']
-            self.speed_curve.setData(data['x'], data['y'])
-            
-        # 更新速限線
-        threshold = self.speed_threshold.value()
-        if len(data['x']) > 0:
-            self.limit_line.setData(
-                [data['x'][0], data['x'][-1]],
-                [threshold, threshold]
-            )
-            
-        # 更新速度分布圖
-        if 'speed_distribution' in results:
-            dist = results['speed_distribution']
-            self.dist_plot.clear()
-            self.dist_plot.plot(
-                x=list(range(len(dist))),
-                y=list(dist.values()),
-                stepMode=True,
-                fillLevel=0,
-                brush=(0,0,255,50)
-            )
+        # 暫停重繪與自動縮放, 所有曲線更新後只重繪一次
+        # (保留原本的自動縮放狀態, 不覆蓋使用者的縮放/平移)
+        view_box = self.speed_plot.getViewBox()
+        auto_x, auto_y = view_box.autoRangeEnabled()
+        self.speed_plot.setUpdatesEnabled(False)
+        self.dist_plot.setUpdatesEnabled(False)
+        view_box.disableAutoRange()
+        try:
+            # 更新速度曲線
+            if 'speed_data' in results:
+                data = results['speed_data']
+                # 速度以float32傳入減少資料量; 時間保留float64以免損失精度
+                x = np.ascontiguousarray(data['x'], dtype=np.float64)
+                y = np.ascontiguousarray(data['y'], dtype=np.float32)
+                self.speed_curve.setData(x, y)
+                
+            # 更新速限線
+            threshold = self.speed_threshold.value()
+            if len(x) > 0:
+                self.limit_line.setData(
+                    x[[0, -1]],
+                    np.full(2, threshold, dtype=np.float32)
+                )
+                
+            # 更新速度分布圖
+            if 'speed_distribution' in results:
+                dist = results['speed_distribution']
+                n = len(dist)
+                # stepMode需要 len(x) == len(y) + 1(區間邊界)
+                self.dist_curve.setData(
+                    x=np.arange(n + 1, dtype=np.float64),
+                    y=np.fromiter(dist.values(), dtype=np.float64, count=n)
+                )
+        finally:
+            view_box.enableAutoRange(x=auto_x, y=auto_y)
+            self.speed_plot.setUpdatesEnabled(True)
+            self.dist_plot.setUpdatesEnabled(True)
             
     def export_results(self):
         """匯出分析結果"""
@@ -574,11 +700,93 @@ class SpeedAnalysisDialog(BaseDialog):
                 f.write(f"# {name}\n")
                 df.to_csv(f, index=False)
                 f.write("\n")
+class EventTableModel(QAbstractTableModel):
+    """事件列表資料模型
+    
+    只在檢視需要顯示某格時才產生該格內容, 不為每筆事件建立表格項目。
+    """
+    
+    HEADERS = ("時間", "類型", "嚴重程度", "位置", "描述")
+    
+    def __init__(self, severity_color: Callable, parent=None):
+        """初始化事件列表模型
+        
+        Args:
+            severity_color: 嚴重程度 -> 背景顏色的函數
+            parent: 父物件
+        """
+        super().__init__(parent)
+        self._severity_color = severity_color
+        self._events: List[Dict] = []
+        self._time_strings: List[str] = []
+        
+    def set_events(self, events: List[Dict]):
+        """替換全部事件(時間字串在此一次格式化)"""
+        self.beginResetModel()
+        self._events = list(events)
+        self._time_strings = _format_times([e['time'] for e in self._events])
+        self.endResetModel()
+        
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._events)
+        
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS)
+        
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if (role == Qt.ItemDataRole.DisplayRole
+                and orientation == Qt.Orientation.Horizontal):
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+        
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+            
+        event = self._events[index.row()]
+        column = index.column()
+        
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return self._time_strings[index.row()]
+            if column == 1:
+                return event['type']
+            if column == 2:
+                return event['severity']
+            if column == 3:
+                return f"{event.get('location', 0):.3f} km"
+            return event.get('description', '')
+            
+        # 嚴重程度欄以背景顏色標示
+        if role == Qt.ItemDataRole.BackgroundRole and column == 2:
+            return self._severity_color(event['severity'])
+            
+        return None
+
 class EventAnalysisDialog(BaseDialog):
     """事件分析對話框"""
     
     analysis_requested = pyqtSignal(dict)  # 分析請求信號
     
+    # 散點圖各嚴重程度顏色
+    SEVERITY_COLORS = {
+        'CRITICAL': (255, 0, 0),    # 紅色
+        'HIGH': (255, 165, 0),      # 橙色
+        'MEDIUM': (255, 255, 0),    # 黃色
+        'LOW': (0, 0, 255),         # 藍色
+        'INFO': (0, 255, 0)         # 綠色
+    }
+    
+    # 事件列表各嚴重程度背景顏色(建立一次, 各列共用)
+    SEVERITY_BACKGROUNDS = {
+        'CRITICAL': QColor(255, 200, 200),  # 淡紅色
+        'HIGH': QColor(255, 230, 200),      # 淡橙色
+        'MEDIUM': QColor(255, 255, 200),    # 淡黃色
+        'LOW': QColor(200, 200, 255),       # 淡藍色
+        'INFO': QColor(200, 255, 200)       # 淡綠色
+    }
+    DEFAULT_BACKGROUND = QColor(255, 255, 255)  # 預設白色
+    
     def __init__(self, parent=None):
         super().__init__(parent, "事件分析")
         self.resize(800, 600)
@@ -687,17 +895,17 @@ class EventAnalysisDialog(BaseDialog):
         list_group = QGroupBox("事件列表")
         list_layout = QVBoxLayout()
         
-        # 建立表格
-        from PyQt6.QtWidgets import QTableWidget, QTableWidgetItem
-        self.event_table = QTableWidget()
-        self.event_table.setColumnCount(5)
-        self.event_table.setHorizontalHeaderLabels([
-            "時間", "類型", "嚴重程度", "位置", "描述"
-        ])
+        # 建立表格(由模型提供資料, 只繪製可見列)
+        self.event_model = EventTableModel(self._get_severity_color, self)
+        self.event_table = QTableView()
+        self.event_table.setModel(self.event_model)
         
-        # 設置表格樣式
+        # 設置表格樣式(固定列高, 不需逐列量測內容)
         header = self.event_table.horizontalHeader()
         header.setStretchLastSection(True)
+        row_header = self.event_table.verticalHeader()
+        row_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        row_header.setDefaultSectionSize(22)
         
         list_layout.addWidget(self.event_table)
         list_group.setLayout(list_layout)
@@ -713,13 +921,29 @@ class EventAnalysisDialog(BaseDialog):
     def setup_plot(self):
         """設置圖表"""
         self.event_plot = pg.PlotWidget()
+        if _HAS_OPENGL:
+            self.event_plot.useOpenGL(True)
         self.event_plot.setBackground('w')
         self.event_plot.showGrid(x=True, y=True)
         self.event_plot.setLabel('left', '事件類型')
         self.event_plot.setLabel('bottom', '時間')
         
         # 添加圖例
-        self.event_plot.addLegend()
+        self.event_legend = self.event_plot.addLegend()
+        
+        # 各嚴重程度一個散點圖項目, 更新時只替換資料
+        # (不設定name, 圖例項目由plot_events依有無事件加入)
+        self.event_scatters = {}
+        for severity, color in self.SEVERITY_COLORS.items():
+            scatter = pg.ScatterPlotItem(
+                pen=None,
+                brush=pg.mkBrush(color),
+                size=8,
+                useCache=True,
+                pxMode=True
+            )
+            self.event_plot.addItem(scatter)
+            self.event_scatters[severity] = scatter
         
     def start_analysis(self):
         """開始分析"""
@@ -759,81 +983,35 @@ class EventAnalysisDialog(BaseDialog):
             
     def plot_events(self, event_data: Dict):
         """繪製事件分布圖"""
-        self.event_plot.clear()
-        
         # 設置Y軸刻度
         event_types = sorted(set(e['type'] for e in event_data['events']))
         y_ticks = [(i, t) for i, t in enumerate(event_types)]
         self.event_plot.getAxis('left').setTicks([y_ticks])
         
-        # 依嚴重程度分類繪製
-        severity_colors = {
-            'CRITICAL': (255, 0, 0),    # 紅色
-            'HIGH': (255, 165, 0),      # 橙色
-            'MEDIUM': (255, 255, 0),    # 黃色
-            'LOW': (0, 0, 255),         # 藍色
-            'INFO': (0, 255, 0)         # 綠色
-        }
-        
-        for severity in severity_colors:
-            events = [e for e in event_data['events'] if e['severity'] == severity]
-            if events:
-                x = [e['timestamp'] for e in events]
-                y = [event_types.index(e['type']) for e in events]
+        # 單次走訪將事件依嚴重程度分組, 類型索引以字典查詢
+        type_index = {t: i for i, t in enumerate(event_types)}
+        buckets = {severity: ([], []) for severity in self.SEVERITY_COLORS}
+        for e in event_data['events']:
+            bucket = buckets.get(e['severity'])
+            if bucket is not None:
+                bucket[0].append(e['timestamp'])
+                bucket[1].append(type_index[e['type']])
                 
-                self.event_plot.plot(
-                    x=x,
-                    y=y,
-                    pen=None,
-                    symbol='o',
-                    symbolPen=None,
-                    symbolBrush=severity_colors[severity],
-                    symbolSize=8,
-                    name=severity
-                )
+        # 依嚴重程度分類繪製(沒有事件的項目清空), 圖例只列出有事件的嚴重程度
+        self.event_legend.clear()
+        for severity, (x, y) in buckets.items():
+            scatter = self.event_scatters[severity]
+            scatter.setData(x=x, y=y)
+            if x:
+                self.event_legend.addItem(scatter, severity)
                 
     def update_event_table(self, events: List[Dict]):
         """更新事件列表"""
-        self.event_table.setRowCount(len(events))
-        
-        for row, event in enumerate(events):
-            # 時間
-            time_item = QTableWidgetItem(
-                event['time'].strftime("%Y-%m-%d %H:%M:%S")
-            )
-            self.event_table.setItem(row, 0, time_item)
-            
-            # 類型
-            type_item = QTableWidgetItem(event['type'])
-            self.event_table.setItem(row, 1, type_item)
-            
-            # 嚴重程度
-            severity_item = QTableWidgetItem(event['severity'])
-            severity_item.setBackground(self._get_severity_color(event['severity']))
-            self.event_table.setItem(row, 2, severity_item)
-            
-            # 位置
-            location_item = QTableWidgetItem(
-                f"{event.get('location', 0):.3f} km"
-            )
-            self.event_table.setItem(row, 3, location_item)
-            
-            # 描述
-            desc_item = QTableWidgetItem(event.get('description', ''))
-            self.event_table.setItem(row, 4, desc_item)
+        self.event_model.set_events(events)
             
     def _get_severity_color(self, severity: str):
         """獲取嚴重程度對應的顏色"""
-        from PyQt6.QtGui import QColor
-        
-        colors = {
-            'CRITICAL': QColor(255, 200, 200),  # 淡紅色
-            'HIGH': QColor(255, 230, 200),      # 淡橙色
-            'MEDIUM': QColor(255, 255, 200),    # 淡黃色
-            'LOW': QColor(200, 200, 255),       # 淡藍色
-            'INFO': QColor(200, 255, 200)       # 淡綠色
-        }
-        return colors.get(severity, QColor(255, 255, 255))  # 預設白色
+        return self.SEVERITY_BACKGROUNDS.get(severity, self.DEFAULT_BACKGROUND)
             
     def export_results(self):
         """匯出分析結果"""
@@ -10,6 +10,7 @@ from datetime import datetime
 import pandas as pd
 from ru_parser.ru_file import RUParser
 from analyzer.atp_analyzer import ATPAnalyzer
+from analyzer.utils import format_timedelta
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -237,7 +238,7 @@ class MainWindow(QMainWindow):
                 f"最高速度: {result.max_speed:.1f} km/h",
                 f"平均速度: {result.avg_speed:.1f} km/h",
                 f"總距離: {result.total_distance:.1f} km",
-                f"總時間: {result.total_time}",
+                f"總時間: {format_timedelta(result.total_time)}",
                 f"超速次數: {result.over_speed_count}次",
                 f"緊急煞車: {result.emergency_brake_count}次",
                 f"ATP關機: {result.atp_down_count}次",
@@ -37,6 +37,10 @@ class ATPDataVisualizer:
         plot.setLabel('left', '速度', units='km/h', color=self.plot_config['foreground'])
         plot.setLabel('bottom', '時間', color=self.plot_config['foreground'])
         
+        # 長時間記錄點數遠多於畫面像素, 只繪製可見範圍並依寬度取峰值降採樣
+        plot.setDownsampling(auto=True, mode='peak')
+        plot.setClipToView(True)
+        
         return plot
         
     def plot_speed_profile(self, plot_widget: pg.PlotWidget,
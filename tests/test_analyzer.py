@@ -1 +1,60 @@
 
+
+import json
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from src.analyzer import ATPAnalyzer
+from src.analyzer import atp_analyzer
+from src.analyzer.exporters import ExcelExporter, JSONExporter
+from src.ru_parser.ru_file import RURecord as ParserRecord
+
+class TestATPAnalyzer(unittest.TestCase):
+    def test_canonical_analyzer(self):
+        # 套件匯出的分析器必須是完整版本(具報告與匯出功能)
+        self.assertIs(ATPAnalyzer, atp_analyzer.ATPAnalyzer)
+        self.assertTrue(hasattr(ATPAnalyzer, 'generate_report'))
+        self.assertTrue(hasattr(ATPAnalyzer, 'export_results'))
+        
+    def test_analyze_parser_records(self):
+        # 解析器產生的記錄(沒有timestamp_ns欄位)也必須能直接分析
+        t0 = datetime(2024, 1, 1, 8, 0, 0)
+        records = [
+            ParserRecord(211, t0 + timedelta(seconds=i), i * 1000, 6000 + i * 10, b'')
+            for i in range(20)
+        ]
+        result = ATPAnalyzer().analyze(records)
+        self.assertAlmostEqual(result.max_speed, 61.9)
+        self.assertEqual(result.total_time, timedelta(seconds=19))
+        
+    def test_export_all_events(self):
+        # 明細上限只限制報告預覽, 匯出仍須包含全部事件
+        t0 = datetime(2024, 1, 1, 8, 0, 0)
+        records = [
+            ParserRecord(211, t0 + timedelta(seconds=i), i * 1000, 6000, b'')
+            for i in range(20)
+        ] + [
+            ParserRecord(2, t0 + timedelta(seconds=i, milliseconds=500),
+                         i * 1000, 6000, b'\x02')
+            for i in range(12)
+        ]
+        records.sort(key=lambda r: r.timestamp)
+        result = ATPAnalyzer({'max_details': 5}).analyze(records)
+        self.assertEqual(len(result.event_stats['重要事件']), 5)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = JSONExporter(tmp).export(result)
+            exported = json.loads(path.read_text(encoding='utf-8'))
+            self.assertEqual(len(exported['event_stats']['重要事件']), 12)
+            self.assertEqual(len(exported['event_stats']['異常事件']), 12)
+            
+            try:
+                import xlsxwriter  # noqa: F401
+                import openpyxl
+            except ImportError:
+                return
+            path = ExcelExporter(tmp).export(result)
+            worksheet = openpyxl.load_workbook(path)['事件分析']
+            rows = [row for row in worksheet.iter_rows(values_only=True)
+                    if row[1] == 'ATP狀態變更']
+            self.assertEqual(len(rows), 12)
@@ -0,0 +1,98 @@
+
+
+import importlib
+import sys
+import types
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+import numpy as np
+
+class MMIParser:
+    EVENT_ERROR = 'error'
+    EVENT_MODE_CHANGE = 'mode_change'
+    EVENT_USER_ACTION = 'user_action'
+
+def setUpModule():
+    # combined_analyzer 匯入的 src.parsers 不在此專案內, 以替身模組載入
+    ru_parser = types.ModuleType('src.parsers.ru_parser')
+    ru_parser.RUParser = ru_parser.RURecord = object
+    mmi_parser = types.ModuleType('src.parsers.mmi_parser')
+    mmi_parser.MMIParser = MMIParser
+    mmi_parser.MMIRecord = object
+    patcher = mock.patch.dict(sys.modules, {
+        'src.parsers': types.ModuleType('src.parsers'),
+        'src.parsers.ru_parser': ru_parser,
+        'src.parsers.mmi_parser': mmi_parser
+    })
+    patcher.start()
+    unittest.addModuleCleanup(patcher.stop)
+    global combined_analyzer
+    combined_analyzer = importlib.import_module('src.analyzer.combined_analyzer')
+
+T0 = datetime(2024, 1, 1, 8, 0, 0)
+
+def at(seconds: float) -> datetime:
+    return T0 + timedelta(seconds=seconds)
+
+class Record:
+    def __init__(self, timestamp):
+        self.timestamp = timestamp
+
+class TestCombinedAnalyzer(unittest.TestCase):
+    def test_match_duplicate_timestamps(self):
+        # 時間相同的MMI記錄取第一筆
+        mmi_t = np.array([9.0, 10.0, 10.0, 10.0, 12.0])
+        ru_t = np.array([10.2, 11.0, 13.5])
+        expected = [1, 1, -1]
+        for match in (combined_analyzer._match_speeds_numpy,
+                      combined_analyzer._match_speeds):
+            self.assertEqual(match(ru_t, mmi_t, 1.0).tolist(), expected)
+        
+        result = combined_analyzer.CombinedAnalyzer().analyze_speed_correlation(
+            [(at(10.2), 50.0)], [(at(10), 60.0), (at(10), 40.0)]
+        )
+        self.assertEqual(result['avg_difference'], 10.0)
+        
+    def test_speed_correlation(self):
+        ru_speeds = [(at(i), 50.0) for i in range(5)]
+        mmi_speeds = [(at(i + 0.1), 50.0 + i) for i in range(4)]
+        result = combined_analyzer.CombinedAnalyzer().analyze_speed_correlation(
+            ru_speeds, mmi_speeds
+        )
+        self.assertEqual(result['match_count'], 5)
+        self.assertEqual(result['max_difference'], 3.0)
+        self.assertEqual([p['time'] for p in result['abnormal_points']],
+                         [at(3), at(4)])
+        
+    def test_event_correlation(self):
+        ru_events = [{'time': at(0), 'type': 2}, {'time': at(10), 'type': 3},
+                     {'time': at(20), 'type': 91}]
+        mmi_events = [{'time': at(0.5), 'event_type': MMIParser.EVENT_ERROR},
+                      {'time': at(10.5), 'event_type': MMIParser.EVENT_ERROR},
+                      {'time': at(30), 'event_type': MMIParser.EVENT_USER_ACTION}]
+        result = combined_analyzer.CombinedAnalyzer().analyze_event_correlation(
+            ru_events, mmi_events
+        )
+        self.assertEqual(len(result['correlated_events']), 1)
+        self.assertEqual(result['correlated_events'][0]['time_diff'], 0.5)
+        self.assertEqual(result['unpaired_ru_events'], ru_events[1:])
+        self.assertEqual(result['unpaired_mmi_events'], mmi_events[1:])
+        
+    def test_system_consistency_report(self):
+        analyzer = combined_analyzer.CombinedAnalyzer()
+        ru_records = [Record(at(t)) for t in (0, 1, 2, 10, 11)]
+        mmi_records = [Record(at(t)) for t in (1, 2, 3)]
+        speed_corr, event_corr, system_cons = analyzer.analyze_all(
+            ru_records, mmi_records, [], [], [], []
+        )
+        self.assertEqual(system_cons['ru_gaps'],
+                         [{'start': at(2), 'end': at(10), 'duration': 8.0}])
+        self.assertEqual(system_cons['mmi_gaps'], [])
+        self.assertEqual(system_cons['time_coverage']['overlap_start'], at(1))
+        
+        report = analyzer.generate_analysis_report(
+            speed_corr, event_corr, system_cons
+        )
+        self.assertIn("- 匹配點數: 0", report)
+        self.assertIn(f"- {at(2)} 至 {at(10)} (間隔8.0秒)", report)
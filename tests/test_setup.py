@@ -0,0 +1,50 @@
+import ast
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SETUP_PY = ROOT / 'setup.py'
+
+def load_setup_names(*names):
+    # 只載入 setup.py 中指定的頂層定義, 匯入整個檔案會執行 setup()
+    tree = ast.parse(SETUP_PY.read_text(encoding='utf-8'))
+    body = [
+        node for node in tree.body
+        if (isinstance(node, ast.FunctionDef) and node.name in names)
+        or (isinstance(node, ast.Assign)
+            and any(getattr(t, 'id', None) in names for t in node.targets))
+    ]
+    namespace = {}
+    exec(compile(ast.Module(body=body, type_ignores=[]), str(SETUP_PY), 'exec'),
+         namespace)
+    return [namespace[name] for name in names]
+
+def importable_packages():
+    # 含Python模組且未被同名模組遮蔽的目錄
+    packages = set()
+    for module in (ROOT / 'src').rglob('*.py'):
+        directory = module.parent
+        if '__pycache__' in directory.parts or directory.with_suffix('.py').exists():
+            continue
+        packages.add('.'.join(directory.relative_to(ROOT).parts))
+    return packages
+
+class TestPyInstallerBuild(unittest.TestCase):
+    def test_exclude_modules(self):
+        # 打包時必須排除執行期不需要的大型模組
+        pyinstaller_args, = load_setup_names('pyinstaller_args')
+        args = pyinstaller_args()
+        excluded = {arg.split('=', 1)[1] for arg in args
+                    if arg.startswith('--exclude-module=')}
+        for module in ['pandas.tests', 'numpy.tests', 'pyqtgraph.examples',
+                       'openpyxl.tests', 'sphinx', 'pytest', 'IPython']:
+            self.assertIn(module, excluded)
+        # 主程式必須是最後一個參數
+        self.assertEqual(args[-1], 'src/main.py')
+
+class TestPackages(unittest.TestCase):
+    def test_packages_match_source_tree(self):
+        # 明確列出的套件清單必須與實際目錄一致
+        packages, = load_setup_names('packages')
+        self.assertEqual(len(packages), len(set(packages)))
+        self.assertEqual(set(packages), importable_packages())